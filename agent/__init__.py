@@ -1,2 +1,14 @@
 # This file makes the agent folder a Python package.
-from .prompt_processor import process_prompt
\ No newline at end of file
+# Exports are resolved on first access so importing the package does not load agno and Gemini.
+import importlib
+
+_EXPORTS = {
+    "process_prompt": ".prompt_processor",
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
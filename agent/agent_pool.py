@@ -0,0 +1,82 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AgentPool:
+    """
+    A process-wide, thread-safe pool of pre-built agents.
+    Agents are created lazily up to the pool size (or eagerly via warm()) and handed
+    out to one caller at a time, so their model and HTTP clients are reused across requests.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 4):
+        self.factory = factory
+        self.size = max(1, size)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def warm(self, count: int = None):
+        """
+        Builds agents ahead of time so the first requests do not pay for construction.
+        """
+        target = self.size if count is None else min(count, self.size)
+        while True:
+            with self._lock:
+                if self._created >= target:
+                    break
+                self._created += 1
+            try:
+                self._idle.put(self.factory())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        logger.info(f"Agent pool warmed with {self._created} agents")
+
+    @contextmanager
+    def acquire(self, timeout: float = None):
+        """
+        Yields an idle agent, creating one if the pool is not yet full,
+        otherwise waiting until another request returns one.
+        """
+        agent = self._checkout(timeout)
+        try:
+            yield agent
+        finally:
+            self._reset(agent)
+            self._idle.put(agent)
+
+    def _checkout(self, timeout: float = None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    @staticmethod
+    def _reset(agent):
+        """
+        Drops the run history an agent accumulates so pooled agents do not grow between requests.
+        """
+        memory = getattr(agent, "memory", None)
+        if memory is not None and hasattr(memory, "clear"):
+            try:
+                memory.clear()
+            except Exception as e:
+                logger.warning(f"Failed to clear agent memory: {e}")
@@ -0,0 +1,100 @@
+import concurrent.futures
+from collections import deque
+from typing import Iterator, List
+from config import AGENT_POOL_SIZE, LARGE_PLAYLIST_CHUNK, LARGE_PLAYLIST_MAX
+from agent.prompt_processor import blocking_agent_pool, build_enhanced_prompt, _run_agent
+from utils.text import song_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Each sub-prompt leans on a different angle so parallel slices overlap as little as possible
+FOCUS_ANGLES = [
+    "the most essential, defining tracks",
+    "deep cuts and album tracks",
+    "releases from the last two years",
+    "older classics that shaped the style",
+    "lesser-known and emerging artists",
+    "artists from outside the US and UK",
+    "collaborations and featured-artist tracks",
+    "fan favourites that were never singles",
+    "songs from closely adjacent sub-genres",
+    "underrated tracks by well-known artists",
+]
+
+# How many recent picks to list in later sub-prompts as "already chosen"
+EXCLUDE_SAMPLE = 30
+
+# Give up after this many slices per chunk of target size (duplicates and short answers)
+MAX_SLICE_FACTOR = 3
+
+def _slice_focus(index: int, total: int, recent: List[str]) -> str:
+    angle = FOCUS_ANGLES[index % len(FOCUS_ANGLES)]
+    focus = f"This is part {index + 1} of {total} of a larger playlist. Emphasize {angle}."
+    if recent:
+        focus += " Do not include any of these songs, which are already in the playlist: " + "; ".join(recent)
+    return focus
+
+def _generate_slice(user_prompt: str, focus: str, chunk_size: int) -> List[dict]:
+    with blocking_agent_pool().acquire() as agent:
+        enhanced_prompt = build_enhanced_prompt(user_prompt, song_count=f"exactly {chunk_size}", focus=focus)
+        return _run_agent(agent, enhanced_prompt, min_songs=chunk_size)
+
+def generate_large_playlist(user_prompt: str, target_size: int, chunk_size: int = LARGE_PLAYLIST_CHUNK,
+                            parallelism: int = AGENT_POOL_SIZE) -> Iterator[dict]:
+    """
+    Generates a playlist of up to target_size songs from parallel, de-duplicated sub-prompts.
+    Songs are yielded as each sub-prompt completes, so callers can preview, resolve and
+    save in chunks. Only the normalized keys of emitted songs are kept for de-duplication;
+    at most `parallelism` sub-prompt results are held in memory at once.
+    """
+    target_size = min(target_size, LARGE_PLAYLIST_MAX)
+    total_slices = -(-target_size // chunk_size)
+    max_slices = total_slices * MAX_SLICE_FACTOR
+    seen = set()
+    recent = deque(maxlen=EXCLUDE_SAMPLE)
+    produced = 0
+    submitted = 0
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="large-playlist")
+    pending = set()
+
+    def fill():
+        nonlocal submitted
+        # Keep just enough sub-prompts in flight to cover what is still missing
+        while (len(pending) < parallelism and submitted < max_slices
+               and produced + len(pending) * chunk_size < target_size):
+            focus = _slice_focus(submitted, total_slices, list(recent))
+            pending.add(executor.submit(_generate_slice, user_prompt, focus, chunk_size))
+            submitted += 1
+
+    try:
+        fill()
+        while pending and produced < target_size:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                try:
+                    songs = future.result()
+                except Exception as e:
+                    logger.error(f"Sub-prompt failed: {e}")
+                    continue
+                added = 0
+                for song in songs:
+                    if not isinstance(song, dict) or not song.get("name") or not song.get("artist"):
+                        continue
+                    key = song_key(song["name"], song["artist"])
+                    if key in seen or produced >= target_size:
+                        continue
+                    seen.add(key)
+                    recent.append(f"{song['name']} by {song['artist']}")
+                    produced += 1
+                    added += 1
+                    yield song
+                logger.info(f"Sub-prompt added {added} new songs ({produced}/{target_size})")
+            fill()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if produced < target_size:
+        logger.warning(f"Large playlist stopped at {produced} of {target_size} songs after {submitted} sub-prompts")
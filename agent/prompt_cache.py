@@ -0,0 +1,116 @@
+import copy
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import FrozenSet, List, Optional
+from config import PROMPT_CACHE_TTL, PROMPT_CACHE_MAX_ENTRIES, PROMPT_CACHE_SIMILARITY
+import logging
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r'[^\w]+')
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalizes a user prompt so that case, accents and punctuation do not change the cache key.
+    """
+    prompt = unicodedata.normalize("NFKD", prompt or "")
+    prompt = "".join(ch for ch in prompt if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", prompt.lower()).strip()
+
+def prompt_shingles(normalized_prompt: str, size: int = 2) -> FrozenSet[str]:
+    """
+    Returns the set of word shingles for a normalized prompt.
+    Prompts shorter than the shingle size fall back to single tokens.
+    """
+    tokens = normalized_prompt.split()
+    if len(tokens) < size:
+        return frozenset(tokens)
+    return frozenset(" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1))
+
+class PromptCache:
+    """
+    In-memory, size-bounded cache of playlist recommendations keyed on the normalized prompt.
+    Exact matches are looked up directly; otherwise the most similar fresh prompt is reused
+    when its shingle Jaccard similarity reaches the configured threshold.
+    """
+
+    def __init__(self, ttl: int = PROMPT_CACHE_TTL, max_entries: int = PROMPT_CACHE_MAX_ENTRIES,
+                 similarity: float = PROMPT_CACHE_SIMILARITY):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # normalized prompt -> (stored_at, shingles, recommendations)
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str) -> Optional[List[dict]]:
+        """
+        Returns a copy of the cached recommendations for prompt, or None on a miss.
+        """
+        key = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            self._drop_expired(now)
+            match = key if key in self._entries else self._find_similar(key)
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(match)
+            recommendations = self._entries[match][2]
+        if match != key:
+            logger.info(f"Prompt cache hit via similar prompt: '{match}'")
+        return copy.deepcopy(recommendations)
+
+    def set(self, prompt: str, recommendations: List[dict]):
+        """
+        Stores the recommendations for prompt, evicting the least recently used entries.
+        """
+        key = normalize_prompt(prompt)
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), prompt_shingles(key), copy.deepcopy(recommendations))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drops every entry and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the hit/miss counters and the current number of entries.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _drop_expired(self, now: float):
+        expired = [key for key, (stored_at, _, _) in self._entries.items() if now - stored_at > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def _find_similar(self, key: str) -> Optional[str]:
+        if self.similarity >= 1 or not key:
+            return None
+        shingles = prompt_shingles(key)
+        best_key, best_score = None, 0.0
+        for candidate, (_, candidate_shingles, _) in self._entries.items():
+            union = len(shingles | candidate_shingles)
+            score = len(shingles & candidate_shingles) / union if union else 0.0
+            if score > best_score:
+                best_key, best_score = candidate, score
+        return best_key if best_score >= self.similarity else None
+
+# Process-wide cache shared by every Streamlit session
+prompt_cache = PromptCache()
@@ -1,125 +1,305 @@
-import json
-import re
+import inspect
+import time
+from typing import Iterator, List
 from agno.agent import Agent
 from agno.models.google import Gemini
 from agno.tools.googlesearch import GoogleSearchTools
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, AGENT_POOL_SIZE, STRUCTURED_OUTPUT, STREAM_GENERATION
+from agent.agent_pool import AgentPool
+from agent.prompt_cache import prompt_cache
+from agent.schemas import Playlist
+from agent.stream_parser import IncrementalSongParser, extract_songs, is_valid_song
+from utils.text import song_key
+from utils.metrics import registry, span, count
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def extract_json(raw_text: str) -> str:
+# Fewer songs than this counts as a failed generation and is topped up
+MIN_SONGS = 15
+
+# Extra songs asked for in a top-up request, to absorb duplicates and invalid entries
+TOP_UP_MARGIN = 5
+
+# Base instructions with clear formatting requirements
+BASE_INSTRUCTION = """
+You are an expert music curator with real-time web access.
+BEFORE generating any song recommendations, you MUST use the provided Google Search tool 
+to look up the most recent song details. DO NOT rely on internal knowledge.
+Use the tool call command: "CALL GOOGLE SEARCH TOOL NOW:" followed by your query.
+"""
+
+# Explicit JSON formatting instructions. The song count is left to each request's prompt,
+# since pooled agents serve both regular playlists and large-playlist slices.
+SONG_INSTRUCTIONS = """
+Instructions:
+- Generate a curated playlist with the number of songs the request asks for.
+- Return ONLY a JSON array with objects containing exactly two keys: "name" (song title) and "artist" (primary artist).
+- Ensure all response is properly formatted as a valid JSON array.
+- Do not include any extra commentary or text outside the JSON array.
+- Example format: [{"name":"Song Title", "artist":"Artist Name"}, {...}]
+"""
+
+def build_agent(structured: bool = False) -> Agent:
+    """
+    Builds a playlist agent with its Gemini model and Google Search tool.
+    A structured agent returns a validated Playlist instead of free text.
+    Agents are expensive to construct, so they are pooled and reused across requests.
+    """
+    # Create the GoogleSearchTools with retry capability
+    search_tool = GoogleSearchTools(
+        fixed_max_results=10,
+        fixed_language="en",
+        timeout=15  # Increased timeout for more reliable results
+    )
+    
+    # Create the agent with a lower temperature for more consistent outputs
+    return Agent(
+        model=Gemini(
+            api_key=GEMINI_API_KEY,
+            id="gemini-2.0-flash-exp",  # Using flash for faster responses
+            temperature=0.1
+        ),
+        tools=[search_tool],
+        description=BASE_INSTRUCTION + "\n" + SONG_INSTRUCTIONS,
+        markdown=not structured,
+        **(_structured_output_options() if structured else {}),
+    )
+
+def _structured_output_options() -> dict:
+    """
+    Agent options for schema-validated output. JSON mode is used because Gemini does not
+    combine native response schemas with tool calls. Newer agno releases renamed
+    response_model to output_schema.
+    """
+    parameters = inspect.signature(Agent.__init__).parameters
+    schema_option = "output_schema" if "output_schema" in parameters else "response_model"
+    return {schema_option: Playlist, "use_json_mode": True}
+
+# Process-wide pools shared by every Streamlit session. Streaming runs need plain-text
+# agents; blocking runs use structured agents when STRUCTURED_OUTPUT is on.
+agent_pool = AgentPool(build_agent, size=AGENT_POOL_SIZE)
+structured_agent_pool = AgentPool(lambda: build_agent(structured=True), size=AGENT_POOL_SIZE)
+
+def blocking_agent_pool() -> AgentPool:
+    """
+    Returns the pool used for blocking (non-streaming) generation runs.
+    """
+    return structured_agent_pool if STRUCTURED_OUTPUT else agent_pool
+
+def warm_agent_pool():
     """
-    Robustly extract a JSON array from raw_text.
-    Uses a simple search for the first occurrence of a bracketed array.
+    Pre-builds the pooled agents used by the default Generate mode.
+    Called once per process at app startup.
     """
     try:
-        # Improved regex pattern to better match JSON arrays
-        match = re.search(r'\[\s*\{.*?\}\s*(?:,\s*\{.*?\}\s*)*\]', raw_text, re.DOTALL)
-        if match:
-            return match.group(0).strip()
-        # Try an alternate approach if first pattern fails
-        match = re.search(r'\[.*\]', raw_text, re.DOTALL)
-        if match:
-            return match.group(0).strip()
-        logger.warning("No JSON array found in the response")
-        return "[]"
+        (agent_pool if STREAM_GENERATION else blocking_agent_pool()).warm()
     except Exception as e:
-        logger.error(f"Error extracting JSON: {e}")
-        return "[]"
+        logger.error(f"Failed to warm agent pool: {e}")
 
-def process_prompt(user_prompt: str):
+def _song_count(song_count: int = None):
+    """
+    Returns the song count to put in the prompt and the fewest songs to accept.
+    Without a count the agent picks 20-25 songs and MIN_SONGS is the floor.
+    """
+    if song_count:
+        return f"exactly {song_count}", song_count
+    return "20-25", MIN_SONGS
+
+def _cached_songs(user_prompt: str, min_songs: int, song_count: int = None):
+    """
+    Returns cached recommendations for the prompt if there are enough of them, trimmed to song_count.
+    """
+    cached = prompt_cache.get(user_prompt)
+    if cached is not None and len(cached) < min_songs:
+        cached = None
+    count("prompt_cache_lookups", result="miss" if cached is None else "hit")
+    if cached is None:
+        return None
+    cached = cached[:song_count] if song_count else cached
+    logger.info(f"Serving {len(cached)} cached song recommendations ({prompt_cache.stats()})")
+    return cached
+
+def process_prompt(user_prompt: str, song_count: int = None):
     """
     Processes the user prompt to generate a playlist recommendation.
     Uses the Google Search tool to fetch live song data and enforces output formatting.
+    Identical or near-identical prompts are served from the prompt cache while fresh.
+    song_count asks for that many songs; without it the agent picks 20-25.
     """
-    # Base instructions with clear formatting requirements
-    base_instruction = """
-    You are an expert music curator with real-time web access.
-    BEFORE generating any song recommendations, you MUST use the provided Google Search tool 
-    to look up the most recent song details. DO NOT rely on internal knowledge.
-    Use the tool call command: "CALL GOOGLE SEARCH TOOL NOW:" followed by your query.
-    """
+    prompt_count, min_songs = _song_count(song_count)
+    cached = _cached_songs(user_prompt, min_songs, song_count)
+    if cached is not None:
+        return cached
     
-    # Explicit JSON formatting instructions
-    song_instructions = """
-    Instructions:
-    - Generate a curated playlist of exactly 20-25 songs.
-    - Return ONLY a JSON array with objects containing exactly two keys: "name" (song title) and "artist" (primary artist).
-    - Ensure all response is properly formatted as a valid JSON array.
-    - Do not include any extra commentary or text outside the JSON array.
-    - Example format: [{"name":"Song Title", "artist":"Artist Name"}, {...}]
+    try:
+        with span("process_prompt", mode="blocking"), blocking_agent_pool().acquire() as agent:
+            recommendations = _run_agent(agent, build_enhanced_prompt(user_prompt, song_count=prompt_count),
+                                         min_songs=min_songs)
+    except Exception as e:
+        logger.error(f"Error in prompt processing: {e}")
+        return []
+    
+    if len(recommendations) >= min_songs:
+        prompt_cache.set(user_prompt, recommendations)
+    return recommendations[:song_count] if song_count else recommendations
+
+def build_enhanced_prompt(user_prompt: str, song_count: str = "20-25", focus: str = None) -> str:
     """
+    Wraps the user request with explicit search and JSON output instructions.
+    An optional focus narrows the request, e.g. for one slice of a large playlist.
+    """
+    focus_line = f"\n    FOCUS: {focus}\n" if focus else ""
+    # Enhanced prompt with explicit JSON output instructions
+    return f"""
+    Given the user request: "{user_prompt}"
+    
+    FIRST: CALL GOOGLE SEARCH TOOL NOW: Search for current songs that match this query: {user_prompt}
+    {focus_line}
+    THEN: Based solely on the search results, generate a curated playlist of {song_count} songs.
     
-    description = base_instruction + "\n" + song_instructions
+    IMPORTANT: Return ONLY a JSON array of song objects with the format:
+    [
+      {{"name": "Song Title 1", "artist": "Artist Name 1"}},
+      {{"name": "Song Title 2", "artist": "Artist Name 2"}},
+      ...
+    ]
     
+    Do not include any explanatory text, commentary, or additional fields.
+    """
+
+def process_prompt_stream(user_prompt: str, song_count: int = None) -> Iterator[dict]:
+    """
+    Streaming variant of process_prompt.
+    Consumes the agent response chunk by chunk and yields each song as soon as
+    its JSON object is complete, so the UI can render the playlist as it arrives.
+    """
+    prompt_count, min_songs = _song_count(song_count)
+    cached = _cached_songs(user_prompt, min_songs, song_count)
+    if cached is not None:
+        yield from cached
+        return
+    
+    enhanced_prompt = build_enhanced_prompt(user_prompt, song_count=prompt_count)
+    recommendations = []
     try:
-        # Create the GoogleSearchTools with retry capability
-        search_tool = GoogleSearchTools(
-            fixed_max_results=10,
-            fixed_language="en",
-            timeout=15  # Increased timeout for more reliable results
-        )
-        
-        # Create the agent with a lower temperature for more consistent outputs
-        agent = Agent(
-            model=Gemini(
-                api_key=GEMINI_API_KEY,
-                id="gemini-2.0-flash-exp",  # Using flash for faster responses
-                temperature=0.1
-            ),
-            tools=[search_tool],
-            description=description,
-            markdown=True,
-        )
-        
-        # Enhanced prompt with explicit JSON output instructions
-        enhanced_prompt = f"""
-        Given the user request: "{user_prompt}"
-        
-        FIRST: CALL GOOGLE SEARCH TOOL NOW: Search for current songs that match this query: {user_prompt}
-        
-        THEN: Based solely on the search results, generate a curated playlist of 20-25 songs.
-        
-        IMPORTANT: Return ONLY a JSON array of song objects with the format:
-        [
-          {{"name": "Song Title 1", "artist": "Artist Name 1"}},
-          {{"name": "Song Title 2", "artist": "Artist Name 2"}},
-          ...
-        ]
-        
-        Do not include any explanatory text, commentary, or additional fields.
-        """
-        
-        # Set a retry mechanism for agent runs
-        max_retries = 2
-        for attempt in range(max_retries + 1):
-            try:
-                response = agent.run(enhanced_prompt)
-                json_text = extract_json(response.content)
-                recommendations = json.loads(json_text)
-                
-                # Verify we have a valid result
-                if isinstance(recommendations, list) and len(recommendations) >= 15:
-                    logger.info(f"Successfully generated {len(recommendations)} song recommendations")
-                    return recommendations
-                else:
-                    logger.warning(f"Generated only {len(recommendations) if isinstance(recommendations, list) else 0} recommendations. Expected at least 15.")
-                    if attempt < max_retries:
-                        logger.info(f"Retrying... Attempt {attempt + 2}/{max_retries + 1}")
-                        continue
-                    return recommendations if isinstance(recommendations, list) else []
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error on attempt {attempt + 1}: {e}\nResponse Content: {json_text}")
-                if attempt < max_retries:
-                    continue
-                return []
-            except Exception as e:
-                logger.error(f"Error in agent run on attempt {attempt + 1}: {e}")
-                if attempt < max_retries:
+        with span("process_prompt", mode="stream"), agent_pool.acquire() as agent:
+            parser = IncrementalSongParser()
+            started = time.perf_counter()
+            for chunk in agent.run(enhanced_prompt, stream=True):
+                content = getattr(chunk, "content", None)
+                if not isinstance(content, str):
                     continue
-                return []
+                for song in parser.feed(content):
+                    if not recommendations:
+                        registry.histogram("agent_first_song_seconds", "Time from agent start to the first streamed song") \
+                            .observe(time.perf_counter() - started)
+                    recommendations.append(song)
+                    yield song
+                    if song_count and len(recommendations) >= song_count:
+                        break
+                if parser.done or (song_count and len(recommendations) >= song_count):
+                    break
+            
+            # A short stream is topped up, and an empty one falls back to the blocking run with retries
+            if len(recommendations) < min_songs:
+                if not recommendations:
+                    logger.warning("No songs parsed from streamed response, falling back to a full run")
+                streamed = len(recommendations)
+                recommendations = _run_agent(agent, enhanced_prompt, min_songs=min_songs, songs=recommendations)
+                recommendations = recommendations[:song_count] if song_count else recommendations
+                yield from recommendations[streamed:]
     except Exception as e:
-        logger.error(f"Error in prompt processing: {e}")
-        return []
\ No newline at end of file
+        logger.error(f"Error in streaming prompt processing: {e}")
+        return
+    
+    logger.info(f"Generated {len(recommendations)} song recommendations")
+    if len(recommendations) >= min_songs:
+        prompt_cache.set(user_prompt, recommendations)
+
+def build_top_up_prompt(enhanced_prompt: str, songs: List[dict], missing: int) -> str:
+    """
+    Asks for only the missing songs of a short answer, listing what is already chosen.
+    """
+    chosen = "; ".join(f"{song['name']} by {song['artist']}" for song in songs)
+    return f"""
+    {enhanced_prompt.strip()}
+    
+    UPDATE: A previous answer already chose these songs: {chosen or "none"}.
+    Return ONLY {missing} ADDITIONAL songs that match the request and are not in that list, in the same format.
+    """
+
+def repair_songs(content) -> List[dict]:
+    """
+    Turns an agent response into a clean song list without another model call.
+    Accepts a validated Playlist, a parsed list or dict, or raw text (where the
+    scanner recovers every complete, valid object). Names and artists are trimmed,
+    invalid entries dropped and duplicates removed.
+    """
+    if isinstance(content, Playlist):
+        candidates = [song.model_dump() for song in content.songs]
+    elif isinstance(content, str):
+        candidates = extract_songs(content)
+    elif isinstance(content, dict):
+        candidates = content.get("songs", [])
+    elif isinstance(content, list):
+        candidates = content
+    else:
+        candidates = []
+    
+    songs = []
+    seen = set()
+    for song in candidates:
+        if hasattr(song, "model_dump"):
+            song = song.model_dump()
+        if not is_valid_song(song):
+            continue
+        song = {**song, "name": song["name"].strip(), "artist": song["artist"].strip()}
+        key = song_key(song["name"], song["artist"])
+        if key not in seen:
+            seen.add(key)
+            songs.append(song)
+    return songs
+
+def _run_agent(agent: Agent, enhanced_prompt: str, min_songs: int = None, songs: List[dict] = None):
+    """
+    Runs the agent for the prompt. A short or partly invalid answer is repaired locally
+    and then topped up with a short follow-up asking only for the missing songs,
+    instead of regenerating the whole playlist. Songs already generated (e.g. streamed)
+    can be passed in, so only the missing ones are asked for.
+    """
+    min_songs = MIN_SONGS if min_songs is None else min_songs
+    
+    # The first run plus up to two top-ups
+    max_retries = 2
+    recommendations = list(songs or [])
+    seen = {song_key(song["name"], song["artist"]) for song in recommendations}
+    for attempt in range(max_retries + 1):
+        prompt = enhanced_prompt
+        if recommendations:
+            missing = min_songs - len(recommendations) + TOP_UP_MARGIN
+            prompt = build_top_up_prompt(enhanced_prompt, recommendations, missing)
+        count("agent_runs", kind="top_up" if recommendations else "full")
+        try:
+            with span("agent_run"):
+                response = agent.run(prompt)
+            with span("extract_songs"):
+                songs = repair_songs(response.content)
+        except Exception as e:
+            logger.error(f"Error in agent run on attempt {attempt + 1}: {e}")
+            continue
+        
+        for song in songs:
+            key = song_key(song["name"], song["artist"])
+            if key not in seen:
+                seen.add(key)
+                recommendations.append(song)
+        
+        # Verify we have a valid result
+        if len(recommendations) >= min_songs:
+            logger.info(f"Successfully generated {len(recommendations)} song recommendations")
+            return recommendations
+        logger.warning(f"Generated only {len(recommendations)} recommendations. Expected at least {min_songs}.")
+        if attempt < max_retries:
+            logger.info(f"Topping up... Attempt {attempt + 2}/{max_retries + 1}")
+    return recommendations
@@ -0,0 +1,23 @@
+from typing import List
+from pydantic import BaseModel, Field, field_validator
+
+class Song(BaseModel):
+    """
+    One recommended track.
+    """
+    name: str = Field(..., description="Song title")
+    artist: str = Field(..., description="Primary artist")
+
+    @field_validator("name", "artist")
+    @classmethod
+    def _not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("must not be blank")
+        return value
+
+class Playlist(BaseModel):
+    """
+    The structured response schema for a generated playlist.
+    """
+    songs: List[Song] = Field(..., description="The curated songs, in playlist order")
@@ -0,0 +1,188 @@
+import json
+import re
+from typing import List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class IncrementalSongParser:
+    """
+    Incrementally parses a JSON array of song objects from streamed model output.
+    Text is fed in arbitrary chunks; each {"name", "artist"} object is returned
+    as soon as its closing brace arrives. Text outside the array (markdown fences,
+    commentary) is ignored, and only the object currently being read is buffered.
+    """
+
+    # Scanner states
+    SEEKING = 0      # looking for the opening '[' of the array
+    ARRAY_START = 1  # saw '[', waiting to confirm the first element is an object
+    IN_ARRAY = 2     # between objects inside the array
+    IN_OBJECT = 3    # inside an object
+    DONE = 4         # the array has been closed
+
+    def __init__(self):
+        self.state = self.SEEKING
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.buffer = []
+        self.count = 0
+
+    @property
+    def done(self) -> bool:
+        return self.state == self.DONE
+
+    def feed(self, text: str) -> List[dict]:
+        """
+        Consumes the next chunk of text and returns the song objects completed by it.
+        """
+        songs = []
+        for ch in text:
+            if self.state == self.DONE:
+                break
+            if self.state == self.SEEKING:
+                if ch == '[':
+                    self.state = self.ARRAY_START
+            elif self.state == self.ARRAY_START:
+                if ch == '{':
+                    self._start_object()
+                elif ch == '[':
+                    pass  # e.g. "[[" - keep treating the latest bracket as the array start
+                elif not ch.isspace():
+                    # Not an array of objects (e.g. a markdown link), keep looking
+                    self.state = self.SEEKING
+            elif self.state == self.IN_ARRAY:
+                if ch == '{':
+                    self._start_object()
+                elif ch == ']':
+                    self.state = self.DONE
+            else:
+                self.buffer.append(ch)
+                if self.in_string:
+                    if self.escaped:
+                        self.escaped = False
+                    elif ch == '\\':
+                        self.escaped = True
+                    elif ch == '"':
+                        self.in_string = False
+                elif ch == '"':
+                    self.in_string = True
+                elif ch == '{':
+                    self.depth += 1
+                elif ch == '}':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        song = self._finish_object()
+                        if song is not None:
+                            songs.append(song)
+        return songs
+
+    def _start_object(self):
+        self.state = self.IN_OBJECT
+        self.depth = 1
+        self.in_string = False
+        self.escaped = False
+        self.buffer = ['{']
+
+    def _finish_object(self):
+        self.state = self.IN_ARRAY
+        raw = "".join(self.buffer)
+        self.buffer = []
+        song = parse_song(raw)
+        if song is not None:
+            self.count += 1
+        return song
+
+def parse_song(raw: str) -> Optional[dict]:
+    """
+    Parses one song object, returning None (and logging why) unless it is a JSON
+    object with non-empty string "name" and "artist" values.
+    """
+    try:
+        song = json.loads(raw)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Skipping malformed song object: {e}")
+        return None
+    if not is_valid_song(song):
+        logger.warning(f"Skipping song object without name/artist: {raw[:100]}")
+        return None
+    return song
+
+def is_valid_song(song) -> bool:
+    return isinstance(song, dict) and _non_empty(song.get("name")) and _non_empty(song.get("artist"))
+
+def _non_empty(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+_DECODER = json.JSONDecoder()
+
+# A JSON string (possibly unterminated, as in a truncated response) or a single bracket.
+# Strings are consumed whole so brackets inside titles are never counted.
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"?|[\[\]{}]')
+_OBJECT_START = re.compile(r'\s*\{')
+
+def extract_songs(text: str) -> List[dict]:
+    """
+    Extracts the song objects from model output in a single pass.
+    Text outside arrays of objects is skipped, brackets inside strings are ignored,
+    malformed or incomplete objects are dropped, and the complete objects of a
+    truncated array are still returned. When several arrays hold songs (e.g. a format
+    example before the answer), the one with the most valid songs wins.
+    """
+    best = []
+    pos = 0
+    while True:
+        start = text.find('[', pos)
+        if start < 0:
+            return best
+        if not _OBJECT_START.match(text, start + 1):
+            pos = start + 1
+            continue
+        groups = None
+        try:
+            # Well-formed output decodes in one C-speed call
+            value, end = _DECODER.raw_decode(text, start)
+        except ValueError:
+            pass
+        else:
+            songs = [song for song in value if is_valid_song(song)] if isinstance(value, list) else []
+            if len(songs) < len(value):
+                logger.warning(f"Skipping {len(value) - len(songs)} array entries without name/artist")
+            if songs:
+                groups, pos = [songs], end
+        if groups is None:
+            groups, pos = _scan_region(text, start)
+        for songs in groups:
+            if len(songs) > len(best):
+                best = songs
+
+def _scan_region(text: str, start: int) -> Tuple[List[List[dict]], int]:
+    """
+    Scans the bracketed region opened at start, up to its closing bracket or the end
+    of a truncated text. Returns the valid songs of each array in it, and where it ended.
+    Objects that contain a valid song are never songs themselves, so their text is not
+    parsed again.
+    """
+    groups = {}
+    # Open brackets: [bracket, position, contains a song candidate]
+    stack = []
+    for match in _TOKEN.finditer(text, start):
+        ch = text[match.start()]
+        if ch == '"':
+            continue
+        if ch in '[{':
+            stack.append([ch, match.start(), False])
+            continue
+        opener, opened_at, nested = stack.pop()
+        parent = stack[-1] if stack else None
+        if opener == '{' and parent is not None and parent[0] == '[':
+            if not nested:
+                song = parse_song(text[opened_at:match.end()])
+                if song is not None:
+                    groups.setdefault(parent[1], []).append(song)
+                    parent[2] = True
+        elif nested and parent is not None:
+            parent[2] = True
+        if not stack:
+            return list(groups.values()), match.end()
+    return list(groups.values()), len(text)
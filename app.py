@@ -1,20 +1,44 @@
+import threading
 import streamlit as st
 from ui.interface import (
     inject_custom_css,
     display_login_cards,
     display_interface,
-    display_playlist_preview
+    display_playlist_preview,
+    display_streaming_preview,
+    display_save_status
 )
-from agent.prompt_processor import process_prompt
-from spotify.auth import spotify_authenticate
-from spotify.playlist import create_spotify_playlist, add_tracks_to_playlist
-from youtube.auth import youtube_authenticate
-from youtube.playlist import create_youtube_playlist, add_tracks_to_youtube_playlist
+from config import STREAM_GENERATION, SPECULATIVE_RESOLUTION, LARGE_PLAYLIST_THRESHOLD
+from jobs.handlers import SAVE_PLAYLIST
+from jobs.queue import job_queue, QUEUED, RUNNING
+from jobs.worker import worker_pool
+from resolver.pipeline import SpeculativeResolver
+from utils.metrics import start_exporters
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _warm_agents():
+    try:
+        from agent.prompt_processor import warm_agent_pool
+        warm_agent_pool()
+    except Exception as e:
+        logger.warning(f"Could not warm the agent pool: {e}")
+
+@st.cache_resource
+def warm_shared_resources():
+    """
+    Builds process-wide resources once per server process, shared by all sessions,
+    and starts the metrics exporters if they are configured.
+    The agent pool (agno, Gemini and the search tools) is imported and built in the
+    background, so the login page renders without waiting for it.
+    """
+    start_exporters()
+    threading.Thread(target=_warm_agents, name="warm-agents", daemon=True).start()
+    worker_pool.start()
+    return True
+
 def main():
     # Configure the page
     st.set_page_config(
@@ -27,6 +51,9 @@ def main():
     # Apply custom CSS styling
     inject_custom_css()
 
+    # Pre-build shared agents and start job workers on the first run of this process
+    warm_shared_resources()
+
     # Initialize session state variables if they don't exist
     if "playlist_details" not in st.session_state:
         st.session_state.playlist_details = None
@@ -35,11 +62,13 @@ def main():
     query_params = st.query_params
     if "code" in query_params:
         st.session_state.yt_code = query_params["code"][0]
-        # Clear the URL to avoid reusing the same code
-        st.query_params.clear()
+        # Drop the code from the URL to avoid reusing it; other parameters (e.g. save_job) stay
+        st.query_params.pop("code", None)
 
     # If no login platform chosen yet, show the login cards
     if "login_platform" not in st.session_state:
+        # A reload drops the login, but a save started before it keeps showing its status
+        show_save_status()
         display_login_cards()
         return  # Stop execution until a platform is selected
 
@@ -48,17 +77,19 @@ def main():
     
     # Handle authentication for the selected platform
     if platform == "spotify":
-        # Authenticate with Spotify if not already done
+        # Authenticate on every run: the cached session makes this free, and refreshes the token before it expires
+        # Platform modules load only for the chosen platform
+        from spotify.auth import spotify_authenticate
+        sp = spotify_authenticate()
+        if sp is None:
+            st.stop()
         if "sp" not in st.session_state:
-            sp = spotify_authenticate()
-            if sp is None:
-                st.stop()
-            else:
-                st.session_state["sp"] = sp
-                st.success("✅ Successfully connected to Spotify!")
+            st.success("✅ Successfully connected to Spotify!")
+        st.session_state["sp"] = sp
     else:  # YouTube Music
         # Authenticate with YouTube Music if not already done
         if "ytmusic" not in st.session_state:
+            from youtube.auth import youtube_authenticate
             ytmusic = youtube_authenticate()
             if ytmusic is None:
                 st.stop()
@@ -68,19 +99,43 @@ def main():
 
     # Display the main interface for generating a playlist
     # and capture button clicks from the custom UI
-    playlist_name, user_prompt, generate_clicked, preview_clicked, save_clicked = display_interface()
+    playlist_name, user_prompt, target_size, generate_clicked, preview_clicked, save_clicked = display_interface()
+    large_playlist = target_size > LARGE_PLAYLIST_THRESHOLD
 
     # Handle Generate button click
     if generate_clicked:
         if user_prompt:
+            from agent.prompt_processor import process_prompt, process_prompt_stream
+            from agent.large_playlist import generate_large_playlist
             with st.spinner("🎧 Processing your prompt and crafting your personalized playlist..."):
                 try:
-                    song_suggestions = process_prompt(user_prompt)
-                    st.session_state.playlist_details = song_suggestions
-                    st.success("✨ Playlist generated successfully!")
+                    # Optionally start resolving songs on the platform while they are generated
+                    resolver = None
+                    if SPECULATIVE_RESOLUTION:
+                        client = st.session_state["sp"] if platform == "spotify" else st.session_state["ytmusic"]
+                        resolver = SpeculativeResolver(platform, client)
+                    st.session_state.speculative_resolver = resolver
                     
-                    # Automatically show preview after generation
-                    display_playlist_preview(song_suggestions)
+                    if STREAM_GENERATION or large_playlist:
+                        # Render songs in the preview as soon as the model emits them
+                        if large_playlist:
+                            song_stream = generate_large_playlist(user_prompt, target_size)
+                        else:
+                            song_stream = process_prompt_stream(user_prompt, target_size)
+                        if resolver:
+                            song_stream = resolver.wrap(song_stream)
+                        song_suggestions = display_streaming_preview(song_stream)
+                        st.session_state.playlist_details = song_suggestions
+                        st.success("✨ Playlist generated successfully!")
+                    else:
+                        song_suggestions = process_prompt(user_prompt, target_size)
+                        if resolver:
+                            song_suggestions = list(resolver.wrap(song_suggestions))
+                        st.session_state.playlist_details = song_suggestions
+                        st.success("✨ Playlist generated successfully!")
+                        
+                        # Automatically show preview after generation
+                        display_playlist_preview(song_suggestions)
                 except Exception as e:
                     logger.error(f"Error generating playlist: {str(e)}")
                     st.error("❌ Something went wrong while generating your playlist. Please try again.")
@@ -97,52 +152,76 @@ def main():
     # Handle Save button click
     if save_clicked:
         if st.session_state.playlist_details:
-            with st.spinner("📝 Saving your playlist to your account..."):
-                name_to_use = playlist_name if playlist_name else "My Sargam AI Playlist"
-                description = f"Playlist created with Sargam AI based on: {user_prompt}"
+            name_to_use = playlist_name if playlist_name else "My Sargam AI Playlist"
+            description = f"Playlist created with Sargam AI based on: {user_prompt}"
+            
+            try:
+                # Pass along whatever speculative resolution has found so far; the job resolves
+                # the rest through the cache, mapping store and search as usual
+                songs = st.session_state.playlist_details
+                resolver = st.session_state.get("speculative_resolver")
+                if resolver and resolver.platform == platform:
+                    songs = resolver.snapshot(songs)
                 
-                try:
-                    # Save to the appropriate platform
-                    if platform == "spotify":
-                        playlist_id = create_spotify_playlist(
-                            st.session_state["sp"],
-                            playlist_name=name_to_use,
-                            description=description
-                        )
-                        add_tracks_to_playlist(
-                            st.session_state["sp"],
-                            playlist_id,
-                            st.session_state.playlist_details
-                        )
-                        st.success("🎉 Playlist successfully saved to your Spotify account!")
-                    else:
-                        playlist_id = create_youtube_playlist(
-                            st.session_state["ytmusic"],
-                            playlist_name=name_to_use,
-                            description=description
-                        )
-                        add_tracks_to_youtube_playlist(
-                            st.session_state["ytmusic"],
-                            playlist_id,
-                            st.session_state.playlist_details
-                        )
-                        st.success("🎉 Playlist successfully saved to your YouTube Music account!")
-                    
-                    # Add a message with the link (if available)
-                    if platform == "spotify":
-                        st.markdown(f"""
-                        <div style="text-align: center; margin-top: 1rem;">
-                            <a href="https://open.spotify.com/playlist/{playlist_id}" target="_blank" 
-                               style="color: #1DB954; text-decoration: none; font-weight: bold;">
-                                Open playlist in Spotify
-                            </a>
-                        </div>
-                        """, unsafe_allow_html=True)
-                except Exception as e:
-                    logger.error(f"Error saving playlist: {str(e)}")
-                    st.error(f"❌ Error saving your playlist: {str(e)}")
+                # Hand the save to a background worker so this script run returns immediately
+                payload = {
+                    "platform": platform,
+                    "playlist_name": name_to_use,
+                    "description": description,
+                    "songs": songs,
+                }
+                # Jobs reference the session's stored credentials and refresh them as they run;
+                # no token is written to the job queue
+                if platform == "spotify":
+                    session = st.session_state.spotify_session
+                    payload["credential_key"] = st.session_state.spotify_cache_key
+                    # The profile was fetched at login, so the job skips its own lookup
+                    payload["user_id"] = session.user_id
+                    payload["account"] = session.user_id
+                else:
+                    payload["credential_key"] = st.session_state.youtube_cache_key
+                    payload["account"] = st.session_state.youtube_cache_key
+                job_id = job_queue.submit(SAVE_PLAYLIST, payload)
+                st.session_state.save_job_id = job_id
+                # Keep the job in the URL so its status survives a page reload
+                st.query_params["save_job"] = job_id
+            except Exception as e:
+                logger.error(f"Error saving playlist: {str(e)}")
+                st.error(f"❌ Error saving your playlist: {str(e)}")
         else:
             st.warning("⚠️ No playlist to save. Please generate a playlist first.")
 
+    show_save_status()
+
+def show_save_status():
+    """
+    Shows the status of the latest background save, from this session or the URL.
+    """
+    job_id = st.session_state.get("save_job_id") or st.query_params.get("save_job")
+    if not job_id:
+        return
+    job = job_queue.get(job_id)
+    if job is None:
+        st.query_params.pop("save_job", None)
+        st.session_state.pop("save_job_id", None)
+    elif job["status"] in (QUEUED, RUNNING):
+        poll_save_status(job_id)
+    else:
+        display_save_status(job)
+
+@st.fragment(run_every=1)
+def poll_save_status(job_id: str):
+    """
+    Re-renders only the save status every second while the job runs, without rerunning
+    the rest of the page (auth included) or blocking the script thread.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return
+    display_save_status(job)
+    if job["status"] not in (QUEUED, RUNNING):
+        # One full rerun replaces the poller with the final status
+        st.rerun()
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
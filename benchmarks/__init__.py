@@ -0,0 +1,2 @@
+# This file makes the benchmarks folder a Python package.
+# Offline benchmarks for the generation and save hot paths; run with `python -m benchmarks.run`.
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark for extracting the song array from model output.
+
+Compares the single-pass scanner (agent.stream_parser.extract_songs) against the
+regex extraction it replaced, on well-formed and adversarial inputs, and reports
+the time per call and how many songs each recovers.
+
+    python -m benchmarks.bench_extract_json --songs 2000 --repeat 5
+"""
+import argparse
+import json
+import re
+import sys
+import time
+
+from agent.stream_parser import extract_songs
+
+def legacy_extract_songs(raw_text: str) -> list:
+    """
+    The previous regex-based extract_json followed by json.loads, as _run_agent used them.
+    """
+    match = re.search(r'\[\s*\{.*?\}\s*(?:,\s*\{.*?\}\s*)*\]', raw_text, re.DOTALL)
+    if not match:
+        match = re.search(r'\[.*\]', raw_text, re.DOTALL)
+    if not match:
+        return []
+    try:
+        songs = json.loads(match.group(0).strip())
+    except json.JSONDecodeError:
+        return []
+    return songs if isinstance(songs, list) else []
+
+def song_array(count: int, title: str = "Song {i}") -> str:
+    return json.dumps([{"name": title.format(i=i), "artist": f"Artist {i}"} for i in range(count)], indent=2)
+
+def make_inputs(songs: int, truncated_songs: int) -> dict:
+    """
+    Returns name -> (text, expected song count).
+    """
+    array = song_array(songs)
+    short_array = song_array(truncated_songs)
+    return {
+        # The common case: a fenced array with a little commentary around it
+        "fenced": (f"Here is your playlist:\n```json\n{array}\n```\nEnjoy!", songs),
+        # Output cut off mid-object by a token limit. The regex backtracks exponentially
+        # here, so this input is kept small (--truncated-songs)
+        "truncated": (short_array[:int(len(short_array) * 0.9)], None),
+        # Brackets and braces inside titles
+        "brackets_in_strings": (song_array(songs, "Song {i} [Live] {{Remix}} (feat. [x])"), songs),
+        # A long run of unclosed brackets before the real array
+        "unclosed_prefix": ("[{" * (songs * 5) + "\n" + array, songs),
+        # A format example ahead of the answer
+        "example_first": ('Format: [{"name":"Song Title", "artist":"Artist Name"}, {...}]\n' + array, songs),
+        # Many small arrays of non-objects in commentary, then the answer
+        "noise": ("see [1] and [2] " * (songs * 5) + array, songs),
+    }
+
+def bench(fn, text: str, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, len(result)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark song array extraction from model output.")
+    parser.add_argument("--songs", type=int, default=2000, help="Songs in each generated response")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per input; the fastest is reported")
+    parser.add_argument("--truncated-songs", type=int, default=20,
+                        help="Songs in the truncated input; each extra song roughly doubles the regex time")
+    args = parser.parse_args(argv)
+
+    print(f"{'input':<20} {'chars':>9} {'regex ms':>10} {'songs':>6} {'scan ms':>10} {'songs':>6} {'speedup':>8}")
+    for name, (text, expected) in make_inputs(args.songs, args.truncated_songs).items():
+        legacy_time, legacy_songs = bench(legacy_extract_songs, text, args.repeat)
+        scan_time, scan_songs = bench(extract_songs, text, args.repeat)
+        speedup = legacy_time / scan_time if scan_time else float("inf")
+        print(f"{name:<20} {len(text):>9} {legacy_time * 1000:>10.2f} {legacy_songs:>6} "
+              f"{scan_time * 1000:>10.2f} {scan_songs:>6} {speedup:>7.1f}x")
+        if expected is not None and scan_songs != expected:
+            print(f"  expected {expected} songs from the scanner, got {scan_songs}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Local stand-ins for the spotipy.Spotify, YTMusic and agno Agent interfaces.
+They answer from a catalog of response-shaped fixtures, sleep for a configurable
+latency, optionally inject 429 responses, and count every call they receive.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "catalog.json")
+
+_BASE62 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+def _synthetic_id(seed: str, length: int) -> str:
+    value = int(hashlib.sha256(seed.encode()).hexdigest(), 16)
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 62)
+        chars.append(_BASE62[index])
+    return "".join(chars)
+
+def _synthetic_track(index: int) -> dict:
+    name, artist = f"Benchmark Song {index}", f"Benchmark Artist {index % 997}"
+    return {
+        "name": name,
+        "artist": artist,
+        "spotify": {
+            "uri": f"spotify:track:{_synthetic_id('sp' + name, 22)}",
+            "name": name,
+            "artists": [{"name": artist}],
+            "external_ids": {"isrc": "ZZ" + _synthetic_id("isrc" + name, 10).upper()},
+        },
+        "ytmusic": {
+            "videoId": _synthetic_id("yt" + name, 11),
+            "title": name,
+            "artists": [{"name": artist}],
+            "resultType": "song",
+        },
+    }
+
+def load_catalog(size: int, path: str = FIXTURES_PATH) -> List[dict]:
+    """
+    Returns `size` catalog entries: the fixture tracks first, then deterministic synthetic ones.
+    """
+    with open(path) as f:
+        tracks = json.load(f)["tracks"]
+    tracks = tracks[:size]
+    tracks.extend(_synthetic_track(i) for i in range(len(tracks), size))
+    return tracks
+
+class ThrottledError(Exception):
+    """
+    Generic 429 error for clients that do not have their own exception type.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__("Server returned HTTP 429: Too Many Requests.")
+        self.http_status = 429
+        self.headers = {"Retry-After": str(retry_after)}
+
+class FakeService:
+    """
+    Shared behaviour: latency, 429 injection and per-method call counting.
+    """
+
+    def __init__(self, catalog: List[dict], latency: float = 0.05, jitter: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, seed: int = 0):
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._by_key = {(t["name"].lower(), t["artist"].lower()): t for t in catalog}
+        self._by_name = {t["name"].lower(): t for t in catalog}
+        self._by_query = {f'{t["name"]} {t["artist"]}'.lower(): t for t in catalog}
+
+    def _call(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            throttled = self._random.random() < self.throttle_rate
+        time.sleep(delay)
+        if throttled:
+            raise self._throttle_error()
+
+    def _throttle_error(self) -> Exception:
+        return ThrottledError(self.retry_after)
+
+    def _lookup(self, name: str, artist: Optional[str]) -> Optional[dict]:
+        if artist is not None:
+            return self._by_key.get((name.lower(), artist.lower()))
+        return self._by_name.get(name.lower())
+
+    def _lookup_query(self, query: str) -> Optional[dict]:
+        """
+        Resolves a free-text "<name> <artist>" or "<name>" query.
+        """
+        query = query.lower().strip()
+        return self._by_query.get(query) or self._by_name.get(query)
+
+class FakeSpotify(FakeService):
+    """
+    Implements the subset of spotipy.Spotify used by spotify/playlist.py.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.playlists: Dict[str, List[str]] = {}
+
+    def _throttle_error(self):
+        from spotipy.exceptions import SpotifyException
+        return SpotifyException(429, -1, "API rate limit exceeded", headers={"Retry-After": str(self.retry_after)})
+
+    def current_user(self):
+        self._call("current_user")
+        return {"id": "benchmark-user", "display_name": "Benchmark"}
+
+    def user_playlist_create(self, user, name, public=True, collaborative=False, description=""):
+        self._call("user_playlist_create")
+        playlist_id = _synthetic_id(f"{name}-{len(self.playlists)}", 22)
+        self.playlists[playlist_id] = []
+        return {"id": playlist_id, "name": name}
+
+    def search(self, q, limit=10, offset=0, type="track", market=None):
+        self._call("search")
+        track = None
+        if q.startswith('track:"'):
+            # Field-filtered exact query: track:"<name>" artist:"<artist>"
+            name, _, rest = q[len('track:"'):].partition('" artist:"')
+            track = self._lookup(name, rest.rstrip('"'))
+        else:
+            track = self._lookup_query(q)
+        items = [track["spotify"]] if track else []
+        return {"tracks": {"items": items[:limit], "total": len(items)}}
+
+    def playlist_add_items(self, playlist_id, items, position=None):
+        self._call("playlist_add_items")
+        self.playlists.setdefault(playlist_id, []).extend(items)
+        return {"snapshot_id": _synthetic_id(f"{playlist_id}-{len(self.playlists[playlist_id])}", 16)}
+
+    def playlist_items(self, playlist_id, fields=None, limit=100, offset=0, **kwargs):
+        self._call("playlist_items")
+        uris = self.playlists.get(playlist_id, [])
+        page = uris[offset:offset + limit]
+        return {
+            "items": [{"track": {"uri": uri}} for uri in page],
+            "next": "more" if offset + limit < len(uris) else None,
+            "total": len(uris),
+        }
+
+class FakeYTMusic(FakeService):
+    """
+    Implements the subset of ytmusicapi.YTMusic used by youtube/playlist.py.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.playlists: Dict[str, List[str]] = {}
+
+    def search(self, query, filter=None, scope=None, limit=20, ignore_spelling=False):
+        self._call("search")
+        track = self._lookup_query(query)
+        return [track["ytmusic"]][:limit] if track else []
+
+    def create_playlist(self, title, description, privacy_status="PRIVATE", video_ids=None, source_playlist=None):
+        self._call("create_playlist")
+        playlist_id = "PL" + _synthetic_id(f"{title}-{len(self.playlists)}", 32)
+        self.playlists[playlist_id] = list(video_ids or [])
+        return playlist_id
+
+    def add_playlist_items(self, playlistId, videoIds=None, source_playlist=None, duplicates=False):
+        self._call("add_playlist_items")
+        self.playlists.setdefault(playlistId, []).extend(videoIds or [])
+        return {"status": "STATUS_SUCCEEDED"}
+
+    def get_playlist(self, playlistId, limit=100, related=False, suggestions_limit=0):
+        self._call("get_playlist")
+        video_ids = self.playlists.get(playlistId, [])
+        return {"id": playlistId, "tracks": [{"videoId": v} for v in video_ids], "trackCount": len(video_ids)}
+
+class FakeAgent(FakeService):
+    """
+    Implements Agent.run for both blocking and streaming calls.
+    Each run returns the next `songs_per_run` catalog tracks as a JSON array,
+    wrapped in a markdown fence like real model output.
+    """
+
+    def __init__(self, *args, songs_per_run: int = 25, chunk_size: int = 40, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.songs_per_run = songs_per_run
+        self.chunk_size = chunk_size
+        self._offset = 0
+
+    def _next_response(self) -> str:
+        with self._lock:
+            start = self._offset
+            self._offset = (self._offset + self.songs_per_run) % max(1, len(self.catalog))
+        tracks = [self.catalog[(start + i) % len(self.catalog)] for i in range(self.songs_per_run)]
+        songs = [{"name": t["name"], "artist": t["artist"]} for t in tracks]
+        return "```json\n" + json.dumps(songs, indent=2) + "\n```"
+
+    def run(self, message, stream=False, **kwargs):
+        self._call("run")
+        content = self._next_response()
+        if not stream:
+            return SimpleNamespace(content=content)
+        return self._stream(content)
+
+    def _stream(self, content: str):
+        per_chunk = self.latency / max(1, len(content) // self.chunk_size)
+        for i in range(0, len(content), self.chunk_size):
+            time.sleep(per_chunk)
+            yield SimpleNamespace(content=content[i:i + self.chunk_size])
@@ -0,0 +1,67 @@
+"""
+Import-time profile for the app's entry points.
+
+Imports each module in a fresh interpreter under `python -X importtime` and reports
+the total import time, peak resident memory, the slowest imports by cumulative time,
+and which heavy third-party packages (LLM, platform and auth clients) were loaded.
+A cold start of the Streamlit entry point should not load any of them.
+
+    python -m benchmarks.import_profile --modules config,app --top 15
+"""
+import argparse
+import subprocess
+import sys
+
+# Packages that should load only in the flows that need them
+HEAVY_PACKAGES = ("agno", "google.genai", "googlesearch", "spotipy", "ytmusicapi",
+                  "google_auth_oauthlib", "google.oauth2", "pydantic")
+
+# Printed by the child after the import, with its peak RSS
+_REPORT = "import resource; print('maxrss', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+def profile(module: str) -> dict:
+    """
+    Imports a module in a fresh interpreter and returns its per-module import times.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}; {_REPORT}"],
+        capture_output=True, text=True
+    )
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line.split(":", 1)[1].split("|"))
+        imports.append((name, int(self_us), int(cumulative_us)))
+    maxrss = next((int(line.split()[1]) for line in proc.stdout.splitlines() if line.startswith("maxrss ")), None)
+    loaded = {name for name, _, _ in imports}
+    return {
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else "",
+        "imports": imports,
+        "total_ms": sum(self_us for _, self_us, _ in imports) / 1000,
+        "maxrss_kb": maxrss,
+        "heavy": [pkg for pkg in HEAVY_PACKAGES if pkg in loaded],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile module import time and memory.")
+    parser.add_argument("--modules", default="config,app", help="Comma-separated modules to import")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list per module")
+    args = parser.parse_args(argv)
+
+    for module in args.modules.split(","):
+        result = profile(module)
+        rss = f"{result['maxrss_kb'] / 1024:.1f} MB" if result["maxrss_kb"] else "n/a"
+        print(f"== {module}: {result['total_ms']:.1f} ms import time, {len(result['imports'])} modules, peak RSS {rss}")
+        if not result["ok"]:
+            print(f"  import failed: {result['error']}")
+        print(f"  heavy packages loaded: {', '.join(result['heavy']) or 'none'}")
+        slowest = sorted(result["imports"], key=lambda item: item[2], reverse=True)[:args.top]
+        print(f"  {'cumulative ms':>14} {'self ms':>9}  module")
+        for name, self_us, cumulative_us in slowest:
+            print(f"  {cumulative_us / 1000:>14.2f} {self_us / 1000:>9.2f}  {name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
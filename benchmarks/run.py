@@ -0,0 +1,184 @@
+"""
+Offline benchmark for the generation and save hot paths.
+
+Runs process_prompt, add_tracks_to_playlist and add_tracks_to_youtube_playlist
+against the local fakes in benchmarks/fakes.py and reports end-to-end latency,
+resolution throughput and platform calls per song for each playlist size.
+
+    python -m benchmarks.run --sizes 25,100,1000,10000 --latency-ms 50 --throttle-rate 0.01
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Sargam AI hot paths against local fakes.")
+    parser.add_argument("--sizes", default="25,100,1000,10000", help="Comma-separated playlist sizes")
+    parser.add_argument("--platforms", default="spotify,ytmusic", help="Comma-separated platforms to save to")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean platform call latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="Uniform latency jitter added per call")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--miss-rate", type=float, default=0.1, help="Fraction of songs missing from the catalog")
+    parser.add_argument("--rps", type=float, default=1000.0, help="Per-platform request rate limit for the run")
+    parser.add_argument("--llm-latency-ms", type=float, default=2000.0, help="Simulated model latency per run")
+    parser.add_argument("--prompt-runs", type=int, default=5, help="Number of process_prompt calls to time")
+    parser.add_argument("--output", help="Append results as JSON lines to this file")
+    parser.add_argument("--metrics", help="Write the collected timing histograms (Prometheus text) to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+def configure_environment(args):
+    """
+    Points caches at a throwaway database and sets the rate limits before any app module is imported.
+    """
+    cache_dir = tempfile.mkdtemp(prefix="sargam-bench-")
+    os.environ["SARGAM_CACHE_DB"] = os.path.join(cache_dir, "cache.sqlite3")
+    os.environ["SARGAM_SPOTIFY_RPS"] = str(args.rps)
+    os.environ["SARGAM_YTMUSIC_RPS"] = str(args.rps)
+    return cache_dir
+
+def make_songs(catalog, miss_rate, rng):
+    songs = []
+    for index, track in enumerate(catalog):
+        if rng.random() < miss_rate:
+            songs.append({"name": f"Unreleased Demo {index}", "artist": "Nobody In Particular"})
+        else:
+            songs.append({"name": track["name"], "artist": track["artist"]})
+    return songs
+
+def bench_save(platform, size, songs, client, phase):
+    """
+    Times one create + resolve + add cycle and summarizes the fake's call counts.
+    """
+    if platform == "spotify":
+        from spotify.playlist import create_spotify_playlist, add_tracks_to_playlist
+        create, add = create_spotify_playlist, add_tracks_to_playlist
+    else:
+        from youtube.playlist import create_youtube_playlist, add_tracks_to_youtube_playlist
+        create, add = create_youtube_playlist, add_tracks_to_youtube_playlist
+
+    client.calls.clear()
+    start = time.perf_counter()
+    playlist_id = create(client, playlist_name=f"Benchmark {size}", description="benchmark")
+    add(client, playlist_id, [dict(song) for song in songs])
+    elapsed = time.perf_counter() - start
+
+    searches = client.calls["search"]
+    return {
+        "benchmark": "save",
+        "platform": platform,
+        "size": size,
+        "phase": phase,
+        "save_seconds": round(elapsed, 4),
+        "songs_per_second": round(size / elapsed, 2) if elapsed else None,
+        "search_calls_per_song": round(searches / size, 3),
+        "total_calls": sum(client.calls.values()),
+        "calls": dict(client.calls),
+        "tracks_added": len(client.playlists.get(playlist_id, [])),
+    }
+
+def bench_prompt(args, catalog):
+    """
+    Times process_prompt with a fake agent, first cold and then served from the prompt cache.
+    """
+    from agent import prompt_processor
+    from agent.agent_pool import AgentPool
+    from benchmarks.fakes import FakeAgent
+
+    fake = FakeAgent(catalog, latency=args.llm_latency_ms / 1000.0, seed=args.seed)
+    prompt_processor.agent_pool = AgentPool(lambda: fake, size=1)
+    prompt_processor.structured_agent_pool = prompt_processor.agent_pool
+    prompt_processor.prompt_cache.clear()
+
+    results = []
+    for phase in ("cold", "warm"):
+        timings = []
+        for run in range(args.prompt_runs):
+            if phase == "cold":
+                prompt_processor.prompt_cache.clear()
+            start = time.perf_counter()
+            songs = prompt_processor.process_prompt(f"benchmark prompt {run % 2}")
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results.append({
+            "benchmark": "process_prompt",
+            "phase": phase,
+            "runs": len(timings),
+            "p50_seconds": round(timings[len(timings) // 2], 4),
+            "max_seconds": round(timings[-1], 4),
+            "songs": len(songs),
+            "agent_runs": fake.calls["run"],
+        })
+        fake.calls.clear()
+    return results
+
+def print_table(rows):
+    save_rows = [r for r in rows if r["benchmark"] == "save"]
+    if save_rows:
+        print(f"{'platform':<9} {'size':>6} {'phase':<5} {'save s':>9} {'songs/s':>9} {'search/song':>11} {'calls':>7}")
+        for r in save_rows:
+            print(f"{r['platform']:<9} {r['size']:>6} {r['phase']:<5} {r['save_seconds']:>9.3f} "
+                  f"{r['songs_per_second'] or 0:>9.1f} {r['search_calls_per_song']:>11.3f} {r['total_calls']:>7}")
+    for r in rows:
+        if r["benchmark"] == "process_prompt":
+            print(f"process_prompt {r['phase']:<5} p50={r['p50_seconds']:.3f}s max={r['max_seconds']:.3f}s "
+                  f"agent_runs={r['agent_runs']} songs={r['songs']}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from benchmarks.fakes import FakeSpotify, FakeYTMusic, load_catalog
+    from spotify.playlist import track_cache as spotify_cache
+    from youtube.playlist import track_cache as youtube_cache
+    from resolver.catalog import catalog as catalog_index
+    from resolver.mapping import mapping_store
+
+    rng = random.Random(args.seed)
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    platforms = [p for p in args.platforms.split(",") if p]
+    fakes = {"spotify": FakeSpotify, "ytmusic": FakeYTMusic}
+    caches = {"spotify": spotify_cache, "ytmusic": youtube_cache}
+
+    rows = []
+    for size in sizes:
+        catalog = load_catalog(size)
+        songs = make_songs(catalog, args.miss_rate, rng)
+        for platform in platforms:
+            client = fakes[platform](
+                catalog,
+                latency=args.latency_ms / 1000.0,
+                jitter=args.jitter_ms / 1000.0,
+                throttle_rate=args.throttle_rate,
+                retry_after=args.retry_after,
+                seed=args.seed,
+            )
+            caches[platform].clear()
+            catalog_index.clear()
+            mapping_store.clear()
+            # Cold: every song is searched; warm: repeat save served from the resolution cache;
+            # index: resolution cache dropped, songs served by the mapping store and catalog index
+            rows.append(bench_save(platform, size, songs, client, "cold"))
+            rows.append(bench_save(platform, size, songs, client, "warm"))
+            caches[platform].clear()
+            rows.append(bench_save(platform, size, songs, client, "index"))
+
+    rows.extend(bench_prompt(args, load_catalog(max(sizes + [25]))))
+    print_table(rows)
+
+    if args.output:
+        with open(args.output, "a") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+    if args.metrics:
+        from utils.metrics import write_metrics_file
+        write_metrics_file(args.metrics)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Headless batch generation: builds many playlists without a browser session.
+
+Reads a JSONL file of jobs, one per line:
+
+    {"id": "rainy-day", "prompt": "mellow songs for a rainy day", "platform": "spotify",
+     "playlist_name": "Rainy Day", "size": 40}
+
+`platform` (spotify or ytmusic) is optional; without it the songs are only generated.
+`size` above LARGE_PLAYLIST_THRESHOLD uses large-playlist generation. Jobs run with
+bounded concurrency in one process, so the prompt, track, catalog and mapping caches
+are shared by all of them. Each finished job is written as one JSONL line with its
+status, playlist ID and timings.
+
+    python cli.py jobs.jsonl --output results.jsonl --concurrency 4
+
+Platform credentials come from the environment (or the matching flags):
+SARGAM_SPOTIFY_REFRESH_TOKEN (refreshed as needed) or SARGAM_SPOTIFY_TOKEN, and
+SARGAM_YTMUSIC_TOKEN.
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, Optional
+from config import BATCH_CONCURRENCY, LARGE_PLAYLIST_THRESHOLD
+from utils.credentials import credential_store
+import logging
+
+logger = logging.getLogger(__name__)
+
+PLATFORMS = ("spotify", "ytmusic")
+
+# Platform -> the auth fields of a save payload (credential_key, account, and user_id for Spotify)
+AuthFields = Dict[str, dict]
+
+def spotify_auth(access_token: str = None, refresh_token: str = None) -> Optional[dict]:
+    """
+    Stores Spotify credentials for this run in the credential store and returns the
+    payload auth fields. With a refresh token, save jobs refresh the access token ahead
+    of expiry for as long as the batch runs; a bare access token is used as-is.
+    """
+    if not (access_token or refresh_token):
+        return None
+    from spotify.auth import SCOPE, build_spotify_job_client
+    key = f"cli-{uuid.uuid4().hex}"
+    credential_store.save("spotify", key, {
+        "access_token": access_token or "",
+        "refresh_token": refresh_token,
+        "token_type": "Bearer",
+        "scope": SCOPE,
+        # A refresh token is exchanged on first use; a bare token is assumed to be fresh
+        "expires_at": 0 if refresh_token else int(time.time()) + 3600,
+    })
+    user_id = build_spotify_job_client(key).current_user()["id"]
+    return {"credential_key": key, "user_id": user_id, "account": user_id}
+
+def ytmusic_auth(access_token: str = None) -> Optional[dict]:
+    """
+    Stores a YouTube Music access token for this run and returns the payload auth fields.
+    """
+    if not access_token:
+        return None
+    key = f"cli-{uuid.uuid4().hex}"
+    credential_store.save("ytmusic", key, {"token": access_token})
+    # No profile is needed to save, so the account is identified by the token itself
+    return {"credential_key": key, "account": hashlib.sha256(access_token.encode()).hexdigest()[:16]}
+
+class InlineReport:
+    """
+    The report handed to save_playlist when it runs inline: a batch job holds no queue
+    lease, so there is no progress to record and nothing to lose.
+    """
+
+    def __call__(self, progress: float, message: str = None, state: dict = None):
+        pass
+
+    def check(self):
+        pass
+
+def read_jobs(path: str) -> Iterator[dict]:
+    """
+    Yields the jobs in a JSONL file ("-" for stdin), skipping blank lines.
+    Jobs without an id are numbered by their line.
+    """
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_number, line in enumerate(handle, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                job = {"error": f"invalid JSON: {e}"}
+            if not isinstance(job, dict):
+                job = {"error": "job must be a JSON object"}
+            job.setdefault("id", str(line_number))
+            yield job
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+def generate_songs(prompt: str, size: int = 0) -> list:
+    """
+    Generates the songs for one prompt, using large-playlist generation above the threshold.
+    Without a size the agent picks 20-25 songs.
+    """
+    if size and size > LARGE_PLAYLIST_THRESHOLD:
+        from agent.large_playlist import generate_large_playlist
+        return list(generate_large_playlist(prompt, size))
+    from agent.prompt_processor import process_prompt
+    return process_prompt(prompt, size or None)
+
+def run_job(job: dict, auth: AuthFields = None, include_songs: bool = False) -> dict:
+    """
+    Generates one playlist and, if the job names a platform, saves it there.
+    Never raises: failures are reported in the result's status and error fields.
+    """
+    auth = auth or {}
+    started = time.perf_counter()
+    platform = job.get("platform")
+    result = {"id": job.get("id"), "prompt": job.get("prompt"), "platform": platform,
+              "status": "failed", "songs": 0, "playlist_id": None, "error": None, "timings": {}}
+    try:
+        if job.get("error"):
+            raise ValueError(job["error"])
+        if not job.get("prompt"):
+            raise ValueError("job has no prompt")
+        if platform and platform not in PLATFORMS:
+            raise ValueError(f"unknown platform {platform!r}; expected one of {', '.join(PLATFORMS)}")
+        if platform and platform not in auth:
+            raise ValueError(f"no {platform} credentials configured")
+
+        songs = generate_songs(job["prompt"], int(job.get("size") or 0))
+        generated = time.perf_counter()
+        result["timings"]["generate_seconds"] = round(generated - started, 3)
+        result["songs"] = len(songs)
+        if include_songs:
+            result["tracks"] = songs
+        if not songs:
+            raise RuntimeError("no songs were generated")
+
+        if platform:
+            from jobs.handlers import save_playlist
+            payload = {
+                "platform": platform,
+                "playlist_name": job.get("playlist_name") or job["prompt"][:100],
+                "description": job.get("description") or f"Playlist created with Sargam AI based on: {job['prompt']}",
+                "songs": songs,
+                **auth[platform],
+            }
+            # Saved by the handler a background worker runs. Each run generates its own songs
+            # and credential keys, so a re-run makes a new playlist rather than resuming this one.
+            saved = save_playlist({"id": job["id"], "lease": uuid.uuid4().hex, "payload": payload},
+                                  InlineReport())
+            result["playlist_id"] = saved["playlist_id"]
+            result["timings"]["save_seconds"] = round(time.perf_counter() - generated, 3)
+        result["status"] = "ok"
+    except Exception as e:
+        logger.error(f"Job {job.get('id')} failed: {e}")
+        result["error"] = str(e)
+    result["timings"]["total_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+def run_batch(jobs: Iterable[dict], concurrency: int = BATCH_CONCURRENCY, auth: AuthFields = None,
+              include_songs: bool = False) -> Iterator[dict]:
+    """
+    Runs jobs with at most `concurrency` in flight and yields each result as it finishes.
+    Jobs are read lazily, so arbitrarily long batches are never held in memory at once.
+    """
+    concurrency = max(1, concurrency)
+    jobs = iter(jobs)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        pending = set()
+        while True:
+            for job in jobs:
+                pending.add(executor.submit(run_job, job, auth, include_songs))
+                if len(pending) >= concurrency:
+                    break
+            if not pending:
+                return
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and save playlists in bulk from a JSONL file of prompts.")
+    parser.add_argument("jobs", help="JSONL file of jobs (prompt, platform, playlist_name, size); - for stdin")
+    parser.add_argument("--output", "-o", default="-", help="JSONL file for per-job results; - for stdout")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Jobs run at the same time")
+    parser.add_argument("--include-songs", action="store_true", help="Include the generated songs in each result")
+    parser.add_argument("--spotify-token", default=os.getenv("SARGAM_SPOTIFY_TOKEN"),
+                        help="Spotify access token (default: $SARGAM_SPOTIFY_TOKEN)")
+    parser.add_argument("--spotify-refresh-token", default=os.getenv("SARGAM_SPOTIFY_REFRESH_TOKEN"),
+                        help="Spotify refresh token, preferred for long runs (default: $SARGAM_SPOTIFY_REFRESH_TOKEN)")
+    parser.add_argument("--ytmusic-token", default=os.getenv("SARGAM_YTMUSIC_TOKEN"),
+                        help="YouTube Music access token (default: $SARGAM_YTMUSIC_TOKEN)")
+    parser.add_argument("--metrics", help="Write the collected timing histograms (Prometheus text) to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    auth = {}
+    for platform, fields in (("spotify", spotify_auth(args.spotify_token, args.spotify_refresh_token)),
+                             ("ytmusic", ytmusic_auth(args.ytmusic_token))):
+        if fields:
+            auth[platform] = fields
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    succeeded = failed = 0
+    started = time.perf_counter()
+    try:
+        for result in run_batch(read_jobs(args.jobs), args.concurrency, auth, args.include_songs):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            if result["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        for platform, fields in auth.items():
+            credential_store.delete(platform, fields["credential_key"])
+    logger.info(f"Batch finished in {time.perf_counter() - started:.1f}s: {succeeded} succeeded, {failed} failed")
+
+    if args.metrics:
+        from utils.metrics import write_metrics_file
+        write_metrics_file(args.metrics)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
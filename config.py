@@ -1,56 +1,149 @@
 import os
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Try to load secrets from Streamlit (st.secrets) if available,
-# otherwise fallback to using environment variables loaded via .env.
-try:
-    import streamlit as st
+# API credentials are resolved on first use (PEP 562 module __getattr__), not at import,
+# so importing config stays cheap and the secrets lookup only runs in flows that need it.
+_SECRETS = {
     # Spotify credentials
-    SPOTIFY_CLIENT_ID = st.secrets["spotify_client_id"]
-    SPOTIFY_CLIENT_SECRET = st.secrets["spotify_client_secret"]
-    SPOTIFY_REDIRECT_URI = st.secrets["spotify_redirect_uri"]
+    "SPOTIFY_CLIENT_ID": "spotify_client_id",
+    "SPOTIFY_CLIENT_SECRET": "spotify_client_secret",
+    "SPOTIFY_REDIRECT_URI": "spotify_redirect_uri",
     # Gemini API key
-    GEMINI_API_KEY = st.secrets["gemini_api_key"]
+    "GEMINI_API_KEY": "gemini_api_key",
     # YouTube Music credentials
-    YTMUSIC_CLIENT_ID = st.secrets["ytmusic_client_id"]
-    YTMUSIC_CLIENT_SECRET = st.secrets["ytmusic_client_secret"]
-    YTMUSIC_REDIRECT_URI = st.secrets["ytmusic_redirect_uri"]
-    logger.info("Loaded API credentials from Streamlit secrets")
-except (ImportError, KeyError) as e:
-    logger.warning(f"Failed to load secrets from Streamlit: {e}")
-    from dotenv import load_dotenv
-    load_dotenv()
-    # Spotify credentials
-    SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
-    SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
-    SPOTIFY_REDIRECT_URI = os.getenv("SPOTIFY_REDIRECT_URI")
-    # Gemini API key
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    # YouTube Music credentials
-    YTMUSIC_CLIENT_ID = os.getenv("YTMUSIC_CLIENT_ID")
-    YTMUSIC_CLIENT_SECRET = os.getenv("YTMUSIC_CLIENT_SECRET")
-    YTMUSIC_REDIRECT_URI = os.getenv("YTMUSIC_REDIRECT_URI")
-    logger.info("Loaded API credentials from environment variables (.env)")
-
-# Check if required credentials are configured.
-missing_creds = []
-if not SPOTIFY_CLIENT_ID:
-    missing_creds.append("SPOTIFY_CLIENT_ID")
-if not SPOTIFY_CLIENT_SECRET:
-    missing_creds.append("SPOTIFY_CLIENT_SECRET")
-if not GEMINI_API_KEY:
-    missing_creds.append("GEMINI_API_KEY")
-if not YTMUSIC_CLIENT_ID:
-    missing_creds.append("YTMUSIC_CLIENT_ID")
-if not YTMUSIC_CLIENT_SECRET:
-    missing_creds.append("YTMUSIC_CLIENT_SECRET")
-if not YTMUSIC_REDIRECT_URI:
-    missing_creds.append("YTMUSIC_REDIRECT_URI")
-
-if missing_creds:
-    logger.warning(f"Missing required credentials: {', '.join(missing_creds)}")
-else:
-    logger.info("All required API credentials are configured")
+    "YTMUSIC_CLIENT_ID": "ytmusic_client_id",
+    "YTMUSIC_CLIENT_SECRET": "ytmusic_client_secret",
+    "YTMUSIC_REDIRECT_URI": "ytmusic_redirect_uri",
+}
+
+def _load_secrets() -> dict:
+    """
+    Loads the credentials from Streamlit (st.secrets) if available,
+    otherwise falls back to environment variables loaded via .env.
+    """
+    try:
+        import streamlit as st
+        secrets = {name: st.secrets[key] for name, key in _SECRETS.items()}
+        logger.info("Loaded API credentials from Streamlit secrets")
+    except (ImportError, KeyError) as e:
+        logger.warning(f"Failed to load secrets from Streamlit: {e}")
+        from dotenv import load_dotenv
+        load_dotenv()
+        secrets = {name: os.getenv(name) for name in _SECRETS}
+        logger.info("Loaded API credentials from environment variables (.env)")
+
+    # Check if required credentials are configured.
+    missing_creds = [name for name in (
+        "SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET", "GEMINI_API_KEY",
+        "YTMUSIC_CLIENT_ID", "YTMUSIC_CLIENT_SECRET", "YTMUSIC_REDIRECT_URI",
+    ) if not secrets[name]]
+    if missing_creds:
+        logger.warning(f"Missing required credentials: {', '.join(missing_creds)}")
+    else:
+        logger.info("All required API credentials are configured")
+    return secrets
+
+def __getattr__(name: str):
+    if name in _SECRETS:
+        # Resolve every credential at once and cache them as ordinary module attributes
+        globals().update(_load_secrets())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Local cache settings. The cache database is shared by every session and process
+# running from this directory, so repeated lookups never reach the platform APIs.
+CACHE_DB_PATH = os.getenv("SARGAM_CACHE_DB", ".sargam_cache.sqlite3")
+TRACK_CACHE_TTL = int(os.getenv("SARGAM_TRACK_CACHE_TTL", str(30 * 24 * 3600)))
+TRACK_CACHE_NEGATIVE_TTL = int(os.getenv("SARGAM_TRACK_CACHE_NEGATIVE_TTL", str(24 * 3600)))
+TRACK_CACHE_MAX_ENTRIES = int(os.getenv("SARGAM_TRACK_CACHE_MAX_ENTRIES", "200000"))
+
+# Prompt recommendation cache. Similar prompts (token-shingle Jaccard similarity at or
+# above PROMPT_CACHE_SIMILARITY) reuse a fresh result; set it to 1 for exact matches only.
+PROMPT_CACHE_TTL = int(os.getenv("SARGAM_PROMPT_CACHE_TTL", str(6 * 3600)))
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("SARGAM_PROMPT_CACHE_MAX_ENTRIES", "512"))
+PROMPT_CACHE_SIMILARITY = float(os.getenv("SARGAM_PROMPT_CACHE_SIMILARITY", "0.85"))
+
+# Number of pre-built agents shared across sessions. Each agent serves one request at a time.
+AGENT_POOL_SIZE = int(os.getenv("SARGAM_AGENT_POOL_SIZE", "4"))
+
+# Stream the agent response and render songs in the preview as soon as they are parsed.
+STREAM_GENERATION = os.getenv("SARGAM_STREAM_GENERATION", "true").lower() in ("1", "true", "yes")
+
+# Resolve songs against the logged-in platform while the playlist is still being generated.
+SPECULATIVE_RESOLUTION = os.getenv("SARGAM_SPECULATIVE_RESOLUTION", "true").lower() in ("1", "true", "yes")
+
+# Resolution engine: maximum lookups in flight per platform, and per-platform search rates
+# (requests per second) enforced with a token bucket shared by every session.
+RESOLVE_CONCURRENCY = int(os.getenv("SARGAM_RESOLVE_CONCURRENCY", "8"))
+SPOTIFY_REQUESTS_PER_SECOND = float(os.getenv("SARGAM_SPOTIFY_RPS", "10"))
+YTMUSIC_REQUESTS_PER_SECOND = float(os.getenv("SARGAM_YTMUSIC_RPS", "5"))
+# Idempotent reads (searches, profile and playlist reads) answered with a 429 or 5xx are
+# retried after the limiter's pause, up to this many times, before the error is raised.
+THROTTLE_RETRIES = int(os.getenv("SARGAM_THROTTLE_RETRIES", "3"))
+
+# Large-playlist mode: targets above the threshold are split into parallel sub-prompts
+# of LARGE_PLAYLIST_CHUNK songs each, and saved in chunks as they arrive.
+LARGE_PLAYLIST_THRESHOLD = int(os.getenv("SARGAM_LARGE_PLAYLIST_THRESHOLD", "50"))
+LARGE_PLAYLIST_CHUNK = int(os.getenv("SARGAM_LARGE_PLAYLIST_CHUNK", "50"))
+LARGE_PLAYLIST_MAX = int(os.getenv("SARGAM_LARGE_PLAYLIST_MAX", "2000"))
+
+# Background jobs (playlist saves). Jobs are persisted in SQLite so they survive reruns,
+# page reloads and process restarts; a job whose lease expires is picked up again.
+JOBS_DB_PATH = os.getenv("SARGAM_JOBS_DB", ".sargam_jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("SARGAM_JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = int(os.getenv("SARGAM_JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("SARGAM_JOB_MAX_ATTEMPTS", "3"))
+
+# Save checkpoints let an interrupted save resume into the same playlist instead of creating a new one.
+SAVE_CHECKPOINT_TTL = int(os.getenv("SARGAM_SAVE_CHECKPOINT_TTL", str(7 * 24 * 3600)))
+
+# Playlist inserts: largest batch each API accepts, and the add latency (seconds) above
+# which batches shrink. Batch size and spacing between batches adapt within these bounds.
+SPOTIFY_MAX_BATCH = int(os.getenv("SARGAM_SPOTIFY_MAX_BATCH", "100"))
+YTMUSIC_MAX_BATCH = int(os.getenv("SARGAM_YTMUSIC_MAX_BATCH", "50"))
+BATCH_TARGET_LATENCY = float(os.getenv("SARGAM_BATCH_TARGET_LATENCY", "2.0"))
+
+# Metrics: timing histograms and counters in the Prometheus text format, served on
+# METRICS_PORT (/metrics) and/or written to METRICS_FILE every METRICS_EXPORT_INTERVAL seconds.
+# Both exporters are off when unset.
+METRICS_PORT = int(os.getenv("SARGAM_METRICS_PORT", "0"))
+METRICS_FILE = os.getenv("SARGAM_METRICS_FILE", "")
+METRICS_EXPORT_INTERVAL = float(os.getenv("SARGAM_METRICS_EXPORT_INTERVAL", "15"))
+
+# Ask the model for schema-validated output (a Playlist of Song objects) on blocking runs.
+# Short or invalid answers are repaired locally and topped up with a short follow-up
+# instead of regenerating the whole playlist. Streaming runs keep parsing plain text.
+STRUCTURED_OUTPUT = os.getenv("SARGAM_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+
+# Catalog index of resolved tracks, matched approximately before any live search.
+# A match must score at least CATALOG_MATCH_THRESHOLD (0..1, title and artist similarity);
+# entries written by other processes are picked up every CATALOG_REFRESH_SECONDS.
+CATALOG_MATCH_THRESHOLD = float(os.getenv("SARGAM_CATALOG_MATCH_THRESHOLD", "0.9"))
+CATALOG_REFRESH_SECONDS = float(os.getenv("SARGAM_CATALOG_REFRESH_SECONDS", "300"))
+
+# Cross-platform mappings (song -> Spotify URI, YouTube videoId, ISRC) older than this are ignored.
+MAPPING_TTL = int(os.getenv("SARGAM_MAPPING_TTL", str(90 * 24 * 3600)))
+
+# OAuth access tokens are refreshed this many seconds before they expire, so no request
+# (including a background save, which refreshes from the credential store) runs on a
+# token that is about to lapse.
+TOKEN_REFRESH_MARGIN = int(os.getenv("SARGAM_TOKEN_REFRESH_MARGIN", "300"))
+
+# Shared HTTP connection pool used by every platform client. HTTP_POOL_MAXSIZE is the
+# number of keep-alive connections kept per host; size it to cover the resolution and
+# job worker concurrency. Connection failures are retried HTTP_CONNECT_RETRIES times;
+# throttled responses are left to the rate limiter. Requests that set no timeout of
+# their own give up after HTTP_TIMEOUT seconds.
+HTTP_POOL_MAXSIZE = int(os.getenv("SARGAM_HTTP_POOL_MAXSIZE", "32"))
+HTTP_CONNECT_RETRIES = int(os.getenv("SARGAM_HTTP_CONNECT_RETRIES", "2"))
+HTTP_TIMEOUT = float(os.getenv("SARGAM_HTTP_TIMEOUT", "30"))
+
+# OAuth credentials for every session, kept in one SQLite store instead of a token file
+# per session. Credentials unused for CREDENTIAL_TTL seconds expire and are compacted away.
+CREDENTIAL_DB_PATH = os.getenv("SARGAM_CREDENTIAL_DB", ".sargam_credentials.sqlite3")
+CREDENTIAL_TTL = int(os.getenv("SARGAM_CREDENTIAL_TTL", str(30 * 24 * 3600)))
+
+# Headless batch runs (cli.py): prompts generated and saved at the same time.
+BATCH_CONCURRENCY = int(os.getenv("SARGAM_BATCH_CONCURRENCY", "4"))
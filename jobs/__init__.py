@@ -0,0 +1,2 @@
+# This file makes the jobs folder a Python package.
+# Background job queue and workers used for playlist saves.
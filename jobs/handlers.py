@@ -0,0 +1,68 @@
+from jobs.worker import register_handler
+from resolver.pipeline import add_in_chunks
+from utils.checkpoint import SaveCheckpoint
+import logging
+
+logger = logging.getLogger(__name__)
+
+SAVE_PLAYLIST = "save_playlist"
+
+def _platform_functions(platform: str):
+    """
+    Returns (client factory taking a credential store key, create function, add function) for a platform.
+    Imported lazily so a worker only loads the platform it needs.
+    """
+    if platform == "spotify":
+        from spotify.auth import build_spotify_job_client
+        from spotify.playlist import create_spotify_playlist, add_tracks_to_playlist
+        return build_spotify_job_client, create_spotify_playlist, add_tracks_to_playlist
+    if platform == "ytmusic":
+        from youtube.auth import build_ytmusic_job_client
+        from youtube.playlist import create_youtube_playlist, add_tracks_to_youtube_playlist
+        return build_ytmusic_job_client, create_youtube_playlist, add_tracks_to_youtube_playlist
+    raise ValueError(f"Unsupported platform: {platform}")
+
+@register_handler(SAVE_PLAYLIST)
+def save_playlist(job: dict, report) -> dict:
+    """
+    Creates the playlist (once, even across retries) and adds the songs in chunks.
+    Progress is checkpointed per save, so a retried job or a repeated Save of the same
+    playlist resumes into the same playlist without re-searching or adding duplicates.
+    Payload: platform, credential_key (where the session's credentials are stored; the
+    client refreshes them as needed), account (whose playlist this is; scopes the
+    checkpoint), playlist_name, description, songs, and optionally user_id (Spotify)
+    to skip the profile lookup.
+    """
+    payload = job["payload"]
+    build_client, create_playlist, add_tracks = _platform_functions(payload["platform"])
+    client = build_client(payload["credential_key"])
+    songs = payload["songs"]
+    checkpoint = SaveCheckpoint.load(payload["platform"], payload["account"], payload["playlist_name"], songs,
+                                     owner=job["lease"], guard=report.check)
+    try:
+        return _save(payload, client, create_playlist, add_tracks, checkpoint, report)
+    finally:
+        # Progress is kept for a retry; ownership is only held while this attempt runs
+        checkpoint.release()
+
+def _save(payload: dict, client, create_playlist, add_tracks, checkpoint: SaveCheckpoint, report) -> dict:
+    songs = payload["songs"]
+    if checkpoint.playlist_id:
+        report(0.05, "Resuming interrupted save")
+    else:
+        report(0.02, "Creating playlist")
+        options = {"user_id": payload["user_id"]} if payload.get("user_id") else {}
+        playlist_id = create_playlist(client, playlist_name=payload["playlist_name"],
+                                      description=payload["description"], **options)
+        if not playlist_id:
+            raise RuntimeError("Playlist could not be created")
+        checkpoint.playlist_id = playlist_id
+        checkpoint.save()
+        report(0.05, "Playlist created")
+
+    def on_chunk(submitted: int):
+        report(0.05 + 0.95 * submitted / max(1, len(songs)), f"Added {submitted} of {len(songs)} songs")
+
+    add_in_chunks(add_tracks, client, checkpoint.playlist_id, songs, on_chunk=on_chunk, checkpoint=checkpoint)
+    checkpoint.complete()
+    return {"platform": payload["platform"], "playlist_id": checkpoint.playlist_id, "songs": len(songs)}
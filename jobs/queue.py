@@ -0,0 +1,222 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Optional
+from config import JOBS_DB_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class LeaseLost(RuntimeError):
+    """
+    Raised to a worker whose lease on a job has expired and been taken over.
+    """
+
+class JobQueue:
+    """
+    A durable job queue backed by SQLite.
+    Workers claim jobs under a lease that is renewed on every progress update and by a
+    heartbeat while the job runs; if a worker dies, its lease expires and another worker
+    resumes the job. Each claim gets
+    a new lease token, and progress, completion and failure are only recorded for the
+    current holder, so a stale worker cannot overwrite a job it no longer owns. Failed
+    jobs are retried until max_attempts is reached.
+    """
+
+    def __init__(self, db_path: str = JOBS_DB_PATH, lease_seconds: int = JOB_LEASE_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    state TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    lease_until REAL,
+                    lease TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "lease" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._conn = conn
+        return self._conn
+
+    def submit(self, kind: str, payload: dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        """
+        Adds a job to the queue and returns its ID.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, max_attempts, now, now)
+            )
+        logger.info(f"Queued {kind} job {job_id}")
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """
+        Atomically takes the oldest runnable job: queued, or running with an expired lease
+        and attempts left. Running jobs whose lease expired on their last attempt are failed.
+        The returned job carries its lease token under "lease".
+        """
+        now = time.time()
+        lease = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                abandoned = conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, error = ?, lease = NULL, lease_until = NULL, updated_at = ?
+                    WHERE status = ? AND lease_until < ? AND attempts >= max_attempts
+                    """,
+                    (FAILED, "Worker lease expired on the final attempt", now, RUNNING, now)
+                ).rowcount
+                if abandoned:
+                    logger.warning(f"Failed {abandoned} jobs whose lease expired on their final attempt")
+                row = conn.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE status = ? OR (status = ? AND lease_until < ?)
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                if row["status"] == RUNNING:
+                    logger.warning(f"Resuming job {row['id']} after its lease expired")
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, lease, now + self.lease_seconds, now, row["id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        job = self._to_dict(row)
+        job["attempts"] += 1
+        job["status"] = RUNNING
+        job["lease"] = lease
+        return job
+
+    def update_progress(self, job_id: str, lease: str, progress: float, message: str = None,
+                        state: dict = None) -> bool:
+        """
+        Records progress (0..1), an optional status message and optional resumable state,
+        and renews the job's lease. Returns False if the lease is no longer held.
+        """
+        now = time.time()
+        with self._lock:
+            if state is None:
+                cursor = self._connect().execute(
+                    """
+                    UPDATE jobs SET progress = ?, message = ?, lease_until = ?, updated_at = ?
+                    WHERE id = ? AND lease = ? AND status = ?
+                    """,
+                    (progress, message, now + self.lease_seconds, now, job_id, lease, RUNNING)
+                )
+            else:
+                cursor = self._connect().execute(
+                    """
+                    UPDATE jobs SET progress = ?, message = ?, state = ?, lease_until = ?, updated_at = ?
+                    WHERE id = ? AND lease = ? AND status = ?
+                    """,
+                    (progress, message, json.dumps(state), now + self.lease_seconds, now, job_id, lease, RUNNING)
+                )
+        return cursor.rowcount == 1
+
+    def renew(self, job_id: str, lease: str) -> bool:
+        """
+        Extends the job's lease without recording progress. Returns False if the lease is no longer held.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND lease = ? AND status = ?",
+                (now + self.lease_seconds, job_id, lease, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, lease: str, result: Any = None) -> bool:
+        """
+        Marks the job done. Returns False (and changes nothing) if the lease is no longer held.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connect().execute(
+                """
+                UPDATE jobs SET status = ?, progress = 1, result = ?, lease = NULL, lease_until = NULL, updated_at = ?
+                WHERE id = ? AND lease = ? AND status = ?
+                """,
+                (DONE, json.dumps(result), now, job_id, lease, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, lease: str, error: str) -> bool:
+        """
+        Records a failed attempt. The job is re-queued unless it has used all its attempts.
+        Returns False (and changes nothing) if the lease is no longer held.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connect().execute(
+                """
+                UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END,
+                    error = ?, lease = NULL, lease_until = NULL, updated_at = ?
+                WHERE id = ? AND lease = ? AND status = ?
+                """,
+                (QUEUED, FAILED, error, now, job_id, lease, RUNNING)
+            )
+        if cursor.rowcount != 1:
+            logger.warning(f"Ignoring failure of job {job_id}: its lease was lost")
+            return False
+        logger.warning(f"Job {job_id} attempt failed: {error}")
+        return True
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        for field in ("payload", "state", "result"):
+            if job.get(field) is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+# Process-wide queue shared by the UI and the workers
+job_queue = JobQueue()
@@ -0,0 +1,141 @@
+import threading
+import time
+from typing import Callable, Dict
+from config import JOB_WORKERS
+from jobs.queue import JobQueue, LeaseLost, job_queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+# kind -> handler(job, report) returning a JSON-serializable result.
+# report(progress, message=None, state=None) records progress and renews the lease, and
+# report.check() renews it without progress; both raise LeaseLost once another worker
+# has taken the job over. Handlers call report.check() before any side effect that must
+# not happen twice, such as adding tracks.
+HANDLERS: Dict[str, Callable] = {}
+
+class Reporter:
+    """
+    The report callable handed to a job handler. While the handler runs, a heartbeat
+    thread renews the lease every third of its length, so a slow step between progress
+    reports cannot let it expire and hand the job to a second worker.
+    """
+
+    def __init__(self, queue: JobQueue, job: dict):
+        self.queue = queue
+        self.job_id = job["id"]
+        self.lease = job["lease"]
+        self._lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __call__(self, progress: float, message: str = None, state: dict = None):
+        self._ensure(self.queue.update_progress(self.job_id, self.lease, progress, message, state))
+
+    def check(self):
+        """
+        Renews the lease now, raising LeaseLost if it is no longer held.
+        """
+        self._ensure(self.queue.renew(self.job_id, self.lease))
+
+    def _ensure(self, held: bool):
+        if self._lost.is_set() or not held:
+            self._lost.set()
+            raise LeaseLost(f"Lease on job {self.job_id} was lost")
+
+    def __enter__(self) -> "Reporter":
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{self.job_id[:8]}", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _heartbeat(self):
+        interval = max(0.1, self.queue.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                held = self.queue.renew(self.job_id, self.lease)
+            except Exception as e:
+                logger.warning(f"Failed to renew lease on job {self.job_id}: {e}")
+                continue
+            if not held:
+                logger.warning(f"Lease on job {self.job_id} was lost")
+                self._lost.set()
+                return
+
+def register_handler(kind: str):
+    """
+    Decorator registering a job handler for a job kind.
+    """
+    def decorator(fn: Callable) -> Callable:
+        HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+class WorkerPool:
+    """
+    A small pool of daemon threads that claim and run jobs from a JobQueue.
+    """
+
+    def __init__(self, queue: JobQueue = job_queue, num_workers: int = JOB_WORKERS, poll_interval: float = 0.5):
+        self.queue = queue
+        self.num_workers = max(1, num_workers)
+        self.poll_interval = poll_interval
+        self._threads = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Starts the worker threads if they are not already running.
+        """
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.num_workers):
+                thread = threading.Thread(target=self._loop, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Started {self.num_workers} job workers")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim()
+            except Exception as e:
+                logger.error(f"Failed to claim job: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def run_job(self, job: dict):
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            self.queue.fail(job["id"], job["lease"], f"No handler registered for job kind '{job['kind']}'")
+            return
+
+        start = time.time()
+        try:
+            with Reporter(self.queue, job) as report:
+                result = handler(job, report)
+        except LeaseLost as e:
+            logger.warning(f"Abandoning job {job['id']} ({job['kind']}): {e}")
+            return
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['kind']}) failed: {e}")
+            self.queue.fail(job["id"], job["lease"], str(e))
+            return
+        if not self.queue.complete(job["id"], job["lease"], result):
+            logger.warning(f"Job {job['id']} ({job['kind']}) finished after its lease was lost")
+            return
+        logger.info(f"Job {job['id']} ({job['kind']}) finished in {time.time() - start:.1f}s")
+
+# Process-wide worker pool; started once per process by the app
+worker_pool = WorkerPool()
@@ -0,0 +1,2 @@
+# This file makes the resolver folder a Python package.
+# Platform-independent track resolution shared by the spotify and youtube packages.
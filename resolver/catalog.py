@@ -0,0 +1,199 @@
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from config import CACHE_DB_PATH, CATALOG_MATCH_THRESHOLD, CATALOG_REFRESH_SECONDS
+from utils.matching import best_candidate
+from utils.text import normalize_text
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Only the rarest query trigrams are used to collect candidates; a true match shares nearly all of them
+PROBE_GRAMS = 6
+
+# Trigrams shared by more entries than this are too common to narrow the search
+MAX_POSTING = 2000
+
+# Candidates scored in full per lookup
+MAX_CANDIDATES = 10
+
+_NUMBERS = re.compile(r'\d+')
+
+def trigrams(text: str) -> set:
+    """
+    Returns the character trigrams of a normalized string, padded so short words still index.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class _Shard:
+    """
+    The in-memory trigram index of one platform's catalog entries.
+    """
+
+    def __init__(self):
+        self.entries: List[Tuple[str, str, str]] = []
+        self.positions: Dict[Tuple[str, str], int] = {}
+        self.postings: Dict[str, array] = {}
+
+    def add(self, title: str, artist: str, platform_id: str):
+        position = self.positions.get((title, artist))
+        if position is not None:
+            self.entries[position] = (title, artist, platform_id)
+            return
+        position = len(self.entries)
+        self.entries.append((title, artist, platform_id))
+        self.positions[(title, artist)] = position
+        for gram in trigrams(title):
+            self.postings.setdefault(gram, array("I")).append(position)
+
+    def candidates(self, title: str) -> List[int]:
+        grams = [self.postings[gram] for gram in trigrams(title) if gram in self.postings]
+        grams = sorted((posting for posting in grams if len(posting) <= MAX_POSTING), key=len)[:PROBE_GRAMS]
+        if not grams:
+            return []
+        counts = Counter()
+        for posting in grams:
+            counts.update(posting)
+        needed = min(2, len(grams))
+        return [position for position, hits in counts.most_common(MAX_CANDIDATES) if hits >= needed]
+
+class CatalogIndex:
+    """
+    A local catalog of tracks already resolved on each platform, keyed by normalized
+    title and artist. Entries are stored compactly in SQLite and indexed in memory by
+    title trigrams, so whole playlists can be matched approximately (punctuation, accents,
+    "feat." credits, small spelling differences) without any platform search.
+    Matches must score at least `threshold` and carry the same numbers in the title.
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, threshold: float = CATALOG_MATCH_THRESHOLD,
+                 refresh_interval: float = CATALOG_REFRESH_SECONDS):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self._shards: Dict[str, _Shard] = {}
+        self._loaded_until = 0.0
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS catalog (
+                    platform TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    artist TEXT NOT NULL,
+                    platform_id TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (platform, title, artist)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS catalog_updated ON catalog (updated_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _refresh(self):
+        """
+        Loads entries written since the last load, including those added by other processes.
+        Must be called with the lock held.
+        """
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshed_at = now
+        rows = self._connect().execute(
+            "SELECT platform, title, artist, platform_id, updated_at FROM catalog WHERE updated_at > ? ORDER BY updated_at",
+            # Overlap slightly so writes from processes with a lagging clock are not missed
+            (self._loaded_until - 5,)
+        ).fetchall()
+        for platform, title, artist, platform_id, updated_at in rows:
+            self._shards.setdefault(platform, _Shard()).add(title, artist, platform_id)
+            self._loaded_until = max(self._loaded_until, updated_at)
+        if rows:
+            logger.info(f"Loaded {len(rows)} catalog entries")
+
+    def add(self, platform: str, title: str, artist: str, platform_id: str):
+        """
+        Records a resolved track. Title and artist should be the platform's own metadata.
+        """
+        title, artist = normalize_text(title), normalize_text(artist)
+        if not title or not platform_id:
+            return
+        try:
+            with self._lock:
+                self._refresh()
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO catalog (platform, title, artist, platform_id, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (platform, title, artist, platform_id, time.time())
+                )
+                conn.commit()
+                self._shards.setdefault(platform, _Shard()).add(title, artist, platform_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Catalog write failed: {e}")
+
+    def clear(self):
+        """
+        Removes every catalog entry.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM catalog")
+            conn.commit()
+            self._shards.clear()
+            self._loaded_until = 0.0
+
+    def lookup(self, platform: str, title: str, artist: str) -> Optional[str]:
+        """
+        Returns the platform ID of the best catalog match for the song, or None.
+        """
+        return self.lookup_many(platform, [{"name": title, "artist": artist}])[0]
+
+    def lookup_many(self, platform: str, songs: List[dict]) -> List[Optional[str]]:
+        """
+        Matches a whole playlist against the catalog in one pass; returns one ID (or None) per song.
+        """
+        results = [None] * len(songs)
+        try:
+            with self._lock:
+                self._refresh()
+                shard = self._shards.get(platform)
+                if shard is None:
+                    return results
+                for index, song in enumerate(songs):
+                    results[index] = self._match(shard, song.get("name", ""), song.get("artist", ""))
+        except sqlite3.Error as e:
+            logger.warning(f"Catalog lookup failed: {e}")
+        return results
+
+    def _match(self, shard: _Shard, title: str, artist: str) -> Optional[str]:
+        title, artist = normalize_text(title), normalize_text(artist)
+        if not title:
+            return None
+        position = shard.positions.get((title, artist))
+        if position is not None:
+            return shard.entries[position][2]
+        numbers = _NUMBERS.findall(title)
+        positions = [p for p in shard.candidates(title) if _NUMBERS.findall(shard.entries[p][0]) == numbers]
+        if not positions:
+            return None
+        candidates = [(shard.entries[p][0], [shard.entries[p][1]]) for p in positions]
+        best_index, score = best_candidate(title, artist, candidates)
+        if best_index is None or score < self.threshold:
+            return None
+        return shard.entries[positions[best_index]][2]
+
+# Process-wide catalog shared by every session and both platforms
+catalog = CatalogIndex()
@@ -0,0 +1,102 @@
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from config import RESOLVE_CONCURRENCY
+from utils.metrics import count
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ResolutionEngine:
+    """
+    Runs track lookups for every session on one shared asyncio event loop.
+    Each platform gets a semaphore that keeps at most `concurrency` lookups in flight;
+    the blocking client calls themselves run on a single shared thread pool.
+    Lookups submitted with a key are coalesced: while one is queued or running, an
+    identical lookup from any session waits for it instead of calling the API again.
+    """
+
+    def __init__(self, concurrency: int = RESOLVE_CONCURRENCY, platforms: int = 2):
+        self.concurrency = max(1, concurrency)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.concurrency * platforms,
+            thread_name_prefix="resolve"
+        )
+        self._loop = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # (platform, fn, key) -> pending task; only touched from the loop thread
+        self._pending: Dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="resolve-loop", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _semaphore(self, platform: str) -> asyncio.Semaphore:
+        # Only called from the loop thread, so no locking is needed
+        if platform not in self._semaphores:
+            self._semaphores[platform] = asyncio.Semaphore(self.concurrency)
+        return self._semaphores[platform]
+
+    async def _run(self, platform: str, fn: Callable, *args):
+        async with self._semaphore(platform):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args))
+
+    async def _run_shared(self, platform: str, fn: Callable, key: Optional[Hashable], *args):
+        if key is None:
+            return await self._run(platform, fn, *args)
+        flight = (platform, fn, key)
+        task = self._pending.get(flight)
+        if task is None:
+            task = asyncio.ensure_future(self._run(platform, fn, *args))
+            self._pending[flight] = task
+            task.add_done_callback(functools.partial(self._forget, flight))
+        else:
+            count("singleflight_shared", flight=f"{platform}_engine")
+        # Shield the shared task so one waiter being cancelled does not cancel it for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, flight: tuple, task: asyncio.Future):
+        if self._pending.get(flight) is task:
+            del self._pending[flight]
+
+    async def _gather(self, platform: str, fn: Callable, items: List[Any], args: tuple, key: Optional[Callable]):
+        return await asyncio.gather(
+            *(self._run_shared(platform, fn, key(item) if key else None, item, *args) for item in items),
+            return_exceptions=True
+        )
+
+    def submit(self, platform: str, fn: Callable, *args, key: Hashable = None) -> concurrent.futures.Future:
+        """
+        Schedules fn(*args) on the engine and returns a future for its result.
+        With a key, an identical pending lookup (same platform, fn and key) is shared.
+        """
+        return asyncio.run_coroutine_threadsafe(self._run_shared(platform, fn, key, *args), self._ensure_loop())
+
+    def map(self, platform: str, fn: Callable, items: List[Any], *args, key: Callable[[Any], Hashable] = None) -> List[Any]:
+        """
+        Runs fn(item, *args) for every item and returns the results in input order.
+        With key, items whose key(item) matches a pending lookup share its result.
+        A lookup that raises yields None for its item.
+        """
+        if not items:
+            return []
+        future = asyncio.run_coroutine_threadsafe(self._gather(platform, fn, list(items), args, key), self._ensure_loop())
+        results = []
+        for item, result in zip(items, future.result()):
+            if isinstance(result, Exception):
+                logger.error(f"Resolution failed for {item}: {result}")
+                result = None
+            results.append(result)
+        return results
+
+# Process-wide engine shared by every session
+engine = ResolutionEngine()
@@ -0,0 +1,201 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from config import CACHE_DB_PATH, MAPPING_TTL
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Platform -> column holding its ID on the canonical song
+PLATFORM_COLUMNS = {
+    "spotify": "spotify_uri",
+    "ytmusic": "video_id",
+}
+
+# Alias platform for the platforms' own track metadata, which every platform may use
+SHARED = ""
+
+class MappingStore:
+    """
+    Links a canonical song to its Spotify URI, YouTube Music videoId and ISRC.
+    A song is reachable through aliases (normalized song keys). The platforms' own
+    title/artist metadata keys are shared: resolutions that share one, an ISRC or a
+    platform ID are merged into one song, so a track resolved on one platform is found
+    without searching when it is saved again on the other. The generated title/artist
+    a platform searched for is only an alias on that platform, since its match may be
+    loose; it never decides another platform's result.
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, ttl: int = MAPPING_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS songs (
+                    id INTEGER PRIMARY KEY,
+                    isrc TEXT UNIQUE,
+                    spotify_uri TEXT,
+                    video_id TEXT,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS songs_spotify ON songs (spotify_uri)")
+            conn.execute("CREATE INDEX IF NOT EXISTS songs_video ON songs (video_id)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS mapping_aliases (
+                    song_key TEXT NOT NULL,
+                    platform TEXT NOT NULL,
+                    song_id INTEGER NOT NULL,
+                    PRIMARY KEY (song_key, platform)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS mapping_aliases_song ON mapping_aliases (song_id)")
+            self._conn = conn
+        return self._conn
+
+    def record(self, platform: str, query_key: str, platform_id: str, metadata_key: str = None,
+               isrc: Optional[str] = None):
+        """
+        Records that platform resolved query_key (the generated song) to platform_id, whose
+        own metadata normalizes to metadata_key. The song is merged with every canonical
+        song already linked to the metadata key, the ISRC or the ID; query_key is only
+        served back to this platform.
+        """
+        column = PLATFORM_COLUMNS[platform]
+        aliases = {}
+        if query_key and query_key != "|":
+            aliases[query_key] = platform
+        if metadata_key and metadata_key != "|":
+            # A query that matches the metadata exactly is metadata too
+            aliases[metadata_key] = SHARED
+        if not platform_id or not aliases:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    song_id = self._merge(conn, column, metadata_key, platform_id, isrc)
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO mapping_aliases (song_key, platform, song_id) VALUES (?, ?, ?)",
+                        [(key, alias_platform, song_id) for key, alias_platform in aliases.items()]
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logger.warning(f"Mapping write failed: {e}")
+
+    def _merge(self, conn: sqlite3.Connection, column: str, metadata_key: Optional[str], platform_id: str,
+               isrc: Optional[str]) -> int:
+        song_ids = set()
+        if metadata_key:
+            song_ids.update(row[0] for row in conn.execute(
+                "SELECT song_id FROM mapping_aliases WHERE song_key = ? AND platform = ?", (metadata_key, SHARED)
+            ))
+        song_ids.update(row[0] for row in conn.execute(f"SELECT id FROM songs WHERE {column} = ?", (platform_id,)))
+        if isrc:
+            song_ids.update(row[0] for row in conn.execute("SELECT id FROM songs WHERE isrc = ?", (isrc,)))
+
+        now = time.time()
+        if not song_ids:
+            return conn.execute(
+                f"INSERT INTO songs (isrc, {column}, updated_at) VALUES (?, ?, ?)", (isrc, platform_id, now)
+            ).lastrowid
+
+        # Fold every other linked song into the oldest one, keeping the first known value of each field
+        target, *others = sorted(song_ids)
+        merged = dict(zip(("isrc", "spotify_uri", "video_id"), conn.execute(
+            "SELECT isrc, spotify_uri, video_id FROM songs WHERE id = ?", (target,)
+        ).fetchone()))
+        for other in others:
+            row = conn.execute("SELECT isrc, spotify_uri, video_id FROM songs WHERE id = ?", (other,)).fetchone()
+            for field, value in zip(("isrc", "spotify_uri", "video_id"), row):
+                merged[field] = merged[field] or value
+            conn.execute("UPDATE mapping_aliases SET song_id = ? WHERE song_id = ?", (target, other))
+            conn.execute("DELETE FROM songs WHERE id = ?", (other,))
+        merged[column] = platform_id
+        merged["isrc"] = merged["isrc"] or isrc
+        conn.execute(
+            "UPDATE songs SET isrc = ?, spotify_uri = ?, video_id = ?, updated_at = ? WHERE id = ?",
+            (merged["isrc"], merged["spotify_uri"], merged["video_id"], now, target)
+        )
+        return target
+
+    def lookup(self, platform: str, key: str) -> Optional[str]:
+        """
+        Returns the platform ID mapped to a song key, or None.
+        """
+        return self.lookup_many(platform, [key]).get(key)
+
+    def lookup_many(self, platform: str, keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Returns song key -> platform ID for the keys with a fresh mapping on the platform,
+        through shared metadata aliases or the platform's own query aliases. A metadata
+        alias wins over a query alias for the same key.
+        """
+        column = PLATFORM_COLUMNS[platform]
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if not keys:
+            return found
+        try:
+            with self._lock:
+                conn = self._connect()
+                # SQLite limits the number of bound parameters, so query in chunks
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"""
+                        SELECT a.song_key, s.{column} FROM mapping_aliases a JOIN songs s ON s.id = a.song_id
+                        WHERE a.song_key IN ({placeholders}) AND a.platform IN (?, ?)
+                            AND s.{column} IS NOT NULL AND s.updated_at > ?
+                        ORDER BY a.platform DESC
+                        """,
+                        [*chunk, SHARED, platform, time.time() - self.ttl]
+                    ).fetchall()
+                    # Platform names sort after SHARED, so metadata aliases are applied last
+                    found.update(rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Mapping lookup failed: {e}")
+        return found
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Returns the full mapping (isrc, spotify_uri, video_id) for a metadata key, or None.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                """
+                SELECT s.isrc, s.spotify_uri, s.video_id FROM mapping_aliases a JOIN songs s ON s.id = a.song_id
+                WHERE a.song_key = ? AND a.platform = ?
+                """,
+                (key, SHARED)
+            ).fetchone()
+        return dict(zip(("isrc", "spotify_uri", "video_id"), row)) if row else None
+
+    def clear(self):
+        """
+        Removes every mapping.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM mapping_aliases")
+            conn.execute("DELETE FROM songs")
+
+# Process-wide mapping store shared by both platforms
+mapping_store = MappingStore()
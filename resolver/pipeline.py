@@ -0,0 +1,126 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from resolver.engine import engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _spotify_resolver() -> Callable[[dict, Any], Optional[str]]:
+    from spotify.playlist import find_track_uri
+
+    def resolve(song, client):
+        track_uri = find_track_uri(song, client)
+        return track_uri.rsplit(":", 1)[-1] if track_uri else None
+    return resolve
+
+def _youtube_resolver() -> Callable[[dict, Any], Optional[str]]:
+    from youtube.playlist import find_youtube_track_id
+    return find_youtube_track_id
+
+# Platform -> (song field holding the resolved ID, resolver factory)
+PLATFORM_RESOLVERS: Dict[str, tuple] = {
+    "spotify": ("spotify_id", _spotify_resolver),
+    "ytmusic": ("video_id", _youtube_resolver),
+}
+
+class SpeculativeResolver:
+    """
+    Resolves songs against a platform in the background while generation is still running.
+    Work runs on the shared resolution engine, so it obeys the same concurrency and rate limits.
+    Each resolved ID is written back onto its song dict (spotify_id / video_id), so the
+    save path can add those songs directly without searching.
+    """
+
+    def __init__(self, platform: str, client):
+        if platform not in PLATFORM_RESOLVERS:
+            raise ValueError(f"Unsupported platform for speculative resolution: {platform}")
+        self.platform = platform
+        self.client = client
+        self.id_field, factory = PLATFORM_RESOLVERS[platform]
+        self._resolve = factory()
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def submit(self, song: dict):
+        """
+        Schedules resolution of a single song.
+        """
+        if song.get(self.id_field):
+            return
+        future = engine.submit(self.platform, self._resolve_song, song)
+        with self._lock:
+            self._futures.append(future)
+
+    def wrap(self, songs: Iterable[dict]) -> Iterator[dict]:
+        """
+        Passes songs through unchanged, scheduling each for resolution as it goes by.
+        """
+        for song in songs:
+            self.submit(song)
+            yield song
+
+    def snapshot(self, songs: Iterable[dict]) -> List[dict]:
+        """
+        Returns copies of the songs carrying whatever IDs have resolved so far, without
+        waiting for pending resolutions. Songs still unresolved are left to the save path.
+        """
+        # Copied so a resolution landing mid-serialization cannot change a dict being read
+        copies = [dict(song) for song in songs]
+        resolved = sum(1 for song in copies if song.get(self.id_field))
+        logger.info(f"{resolved} of {len(copies)} songs were resolved ahead of save")
+        return copies
+
+    def _resolve_song(self, song: dict) -> bool:
+        try:
+            resolved_id = self._resolve(song, self.client)
+        except Exception as e:
+            logger.warning(f"Speculative resolution failed for {song.get('name')}: {e}")
+            return False
+        if resolved_id:
+            song[self.id_field] = resolved_id
+            return True
+        return False
+
+def add_in_chunks(add_tracks: Callable, client, playlist_id: str, songs: Iterable[dict], chunk_size: int = 100,
+                  on_chunk: Callable[[int], None] = None, checkpoint=None) -> int:
+    """
+    Resolves and adds songs to a playlist one chunk at a time as they arrive from an iterator.
+    add_tracks is the platform's add function (add_tracks_to_playlist or
+    add_tracks_to_youtube_playlist). Only one chunk is held in memory at a time.
+    on_chunk, if given, is called with the running total after each chunk.
+    With a SaveCheckpoint, chunks committed by an earlier attempt are skipped
+    and each finished chunk is recorded.
+    Returns the number of songs submitted.
+    """
+    skip = checkpoint.committed_songs if checkpoint else 0
+    chunk = []
+    submitted = 0
+
+    def flush():
+        nonlocal chunk, submitted
+        if checkpoint:
+            add_tracks(client, playlist_id, chunk, checkpoint=checkpoint)
+        else:
+            add_tracks(client, playlist_id, chunk)
+        submitted += len(chunk)
+        chunk = []
+        if checkpoint:
+            checkpoint.committed_songs = submitted
+            checkpoint.save()
+        if on_chunk:
+            on_chunk(submitted)
+
+    for song in songs:
+        if submitted + len(chunk) < skip:
+            # Already committed by an interrupted attempt
+            submitted += 1
+            continue
+        chunk.append(song)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    if skip:
+        logger.info(f"Skipped {min(skip, submitted)} songs committed by an earlier attempt")
+    logger.info(f"Submitted {submitted} songs to playlist {playlist_id} in chunks of {chunk_size}")
+    return submitted
@@ -1,4 +1,16 @@
 # This file makes the spotify folder a Python package.
-# You can also import functions from auth and playlist here if needed.
-from .auth import spotify_authenticate
-from .playlist import create_spotify_playlist, add_tracks_to_playlist
+# Exports are resolved on first access so importing the package does not load spotipy.
+import importlib
+
+_EXPORTS = {
+    "spotify_authenticate": ".auth",
+    "create_spotify_playlist": ".playlist",
+    "add_tracks_to_playlist": ".playlist",
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,20 @@
+import threading
+import time
 import uuid
 import streamlit as st
 import spotipy
+from spotipy.cache_handler import CacheHandler
 from spotipy.oauth2 import SpotifyOAuth
-from config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, SPOTIFY_REDIRECT_URI
+from utils.credentials import credential_store
+from utils.http import http_session
+from config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, SPOTIFY_REDIRECT_URI, TOKEN_REFRESH_MARGIN
 import logging
 
 logger = logging.getLogger(__name__)
 
+# The permissions the app requests
+SCOPE = "playlist-modify-private playlist-modify-public user-read-private user-read-email"
+
 def show_login_button():
     """
     Displays a styled Spotify login button.
@@ -34,46 +42,152 @@ def show_login_button():
     """
     st.markdown(button_html, unsafe_allow_html=True)
 
+def build_spotify_client(access_token: str) -> spotipy.Spotify:
+    """
+    Builds a Spotify client for an OAuth access token on the shared HTTP connection pool.
+    """
+    return spotipy.Spotify(auth=access_token, requests_session=http_session())
+
+class StoreCacheHandler(CacheHandler):
+    """
+    Keeps a session's Spotify token in the shared credential store instead of a cache file.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def get_cached_token(self):
+        return credential_store.load("spotify", self.key)
+
+    def save_token_to_cache(self, token_info):
+        credential_store.save("spotify", self.key, token_info)
+
+def build_spotify_oauth(cache_key: str, show_dialog: bool = False) -> SpotifyOAuth:
+    """
+    Builds the OAuth manager for a session whose token is kept in the credential store under cache_key.
+    """
+    return SpotifyOAuth(
+        client_id=SPOTIFY_CLIENT_ID,
+        client_secret=SPOTIFY_CLIENT_SECRET,
+        redirect_uri=SPOTIFY_REDIRECT_URI,
+        scope=SCOPE,
+        cache_handler=StoreCacheHandler(cache_key),
+        show_dialog=show_dialog,
+        requests_session=http_session()
+    )
+
+class StoredTokenManager:
+    """
+    A spotipy auth manager for background jobs. It reads the session's token from the
+    credential store on each request and refreshes it there ahead of expiry, so a job
+    never carries a raw token and keeps working however long it runs or waits.
+    """
+
+    def __init__(self, cache_key: str):
+        self.cache_key = cache_key
+        self.oauth = build_spotify_oauth(cache_key)
+        self._lock = threading.Lock()
+
+    def get_access_token(self, as_dict: bool = False):
+        with self._lock:
+            token_info = credential_store.load("spotify", self.cache_key)
+            if not token_info:
+                raise RuntimeError("Spotify credentials have expired; log in again to save")
+            if token_info.get("expires_at", 0) - time.time() < TOKEN_REFRESH_MARGIN and token_info.get("refresh_token"):
+                # Saved back to the credential store by the cache handler
+                token_info = self.oauth.refresh_access_token(token_info["refresh_token"])
+        return token_info if as_dict else token_info["access_token"]
+
+def build_spotify_job_client(cache_key: str) -> spotipy.Spotify:
+    """
+    Builds a Spotify client for a background job from the credentials stored under cache_key.
+    """
+    manager = StoredTokenManager(cache_key)
+    # Fail fast if the credentials are gone rather than on the first request
+    manager.get_access_token()
+    return spotipy.Spotify(auth_manager=manager, requests_session=http_session())
+
+class SpotifySession:
+    """
+    Cached Spotify auth state for one Streamlit session: the token, its expiry, one
+    client built for it and the user's profile. Reruns reuse all of it without any
+    network call; the token is refreshed shortly before it expires rather than after
+    a request fails, and the profile is fetched once per login.
+    """
+
+    def __init__(self, oauth: SpotifyOAuth, token_info: dict):
+        self.oauth = oauth
+        self._set_token(token_info)
+        self._user = None
+
+    def _set_token(self, token_info: dict):
+        self.token_info = token_info
+        # Older cached tokens may lack expires_at; fall back to expires_in from now
+        self.expires_at = token_info.get("expires_at") or time.time() + token_info.get("expires_in", 3600)
+        self._client = build_spotify_client(token_info["access_token"])
+
+    def needs_refresh(self) -> bool:
+        return time.time() >= self.expires_at - TOKEN_REFRESH_MARGIN
+
+    def refresh(self):
+        logger.info("Refreshing Spotify token ahead of expiry")
+        self._set_token(self.oauth.refresh_access_token(self.token_info["refresh_token"]))
+
+    @property
+    def client(self) -> spotipy.Spotify:
+        if self.needs_refresh():
+            self.refresh()
+        return self._client
+
+    @property
+    def access_token(self) -> str:
+        if self.needs_refresh():
+            self.refresh()
+        return self.token_info["access_token"]
+
+    @property
+    def user(self) -> dict:
+        """
+        The current user's profile, fetched once. Raises if the token is rejected.
+        """
+        if self._user is None:
+            self._user = self.client.current_user()
+        return self._user
+
+    @property
+    def user_id(self) -> str:
+        return self.user["id"]
+
 def spotify_authenticate():
     """
     Handles the Spotify OAuth authentication flow in Streamlit.
     Returns an authenticated Spotify client or None if authentication fails.
     """
-    # Define the required permissions
-    scope = "playlist-modify-private playlist-modify-public user-read-private user-read-email"
-    
     # Initialize session state variables if they don't exist
-    if 'spotify_cache_path' not in st.session_state:
-        st.session_state.spotify_cache_path = f".spotifycache-{uuid.uuid4()}"
+    if 'spotify_cache_key' not in st.session_state:
+        st.session_state.spotify_cache_key = str(uuid.uuid4())
     
     # Create OAuth manager if it doesn't exist
     if 'sp_oauth' not in st.session_state:
         try:
-            st.session_state.sp_oauth = SpotifyOAuth(
-                client_id=SPOTIFY_CLIENT_ID,
-                client_secret=SPOTIFY_CLIENT_SECRET,
-                redirect_uri=SPOTIFY_REDIRECT_URI,
-                scope=scope,
-                cache_path=st.session_state.spotify_cache_path,
-                show_dialog=True
-            )
+            st.session_state.sp_oauth = build_spotify_oauth(st.session_state.spotify_cache_key, show_dialog=True)
             logger.info("Initialized Spotify OAuth manager")
         except Exception as e:
             logger.error(f"Failed to initialize Spotify OAuth: {e}")
             st.error(f"Failed to initialize Spotify authentication: {str(e)}")
             return None
     
-    # Check if we already have a valid token in session state
-    if 'token_info' in st.session_state:
+    # Reuse the session's cached client; this needs no network call unless the token is about to expire
+    session = st.session_state.get('spotify_session')
+    if session is not None:
         try:
-            # Test if the token is still valid
-            sp = spotipy.Spotify(auth=st.session_state.token_info['access_token'])
-            sp.current_user()  # This will fail if the token is invalid
-            logger.info("Using existing Spotify token")
-            return sp
+            client = session.client
+            logger.debug("Using cached Spotify session")
+            return client
         except Exception as e:
-            logger.warning(f"Existing token is invalid, clearing: {e}")
-            st.session_state.pop('token_info', None)
+            logger.warning(f"Could not refresh Spotify token, clearing session: {e}")
+            for key in ('spotify_session', 'token_info', 'sp'):
+                st.session_state.pop(key, None)
             st.rerun()
     
     # Check for authorization code in URL query parameters
@@ -101,21 +215,19 @@ def spotify_authenticate():
         show_login_button()
         return None
     
-    # Check if token is expired and refresh if needed
-    if st.session_state.sp_oauth.is_token_expired(token_info):
-        try:
-            logger.info("Token expired, refreshing")
-            token_info = st.session_state.sp_oauth.refresh_access_token(
-                token_info['refresh_token']
-            )
-            st.session_state.token_info = token_info
-        except Exception as e:
-            logger.error(f"Failed to refresh token: {e}")
-            st.error(f"Failed to refresh token: {str(e)}")
-            st.session_state.pop("token_info", None)
-            show_login_button()
-            return None
+    # Validate the token once per login by fetching the profile, and cache the session
+    try:
+        session = SpotifySession(st.session_state.sp_oauth, token_info)
+        user = session.user
+    except Exception as e:
+        logger.error(f"Spotify token was rejected: {e}")
+        st.error(f"Spotify authentication failed: {str(e)}")
+        st.session_state.pop("token_info", None)
+        show_login_button()
+        return None
+    st.session_state.spotify_session = session
+    st.session_state.token_info = session.token_info
     
     # Return the authenticated client
-    logger.info("Successfully authenticated with Spotify")
-    return spotipy.Spotify(auth=token_info["access_token"])
\ No newline at end of file
+    logger.info(f"Successfully authenticated with Spotify as {user.get('id')}")
+    return session.client
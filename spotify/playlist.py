@@ -1,19 +1,37 @@
 import re
-import time
-import concurrent.futures
 from spotipy.exceptions import SpotifyException
-import difflib  # For fuzzy matching
+from config import TRACK_CACHE_TTL, TRACK_CACHE_NEGATIVE_TTL, TRACK_CACHE_MAX_ENTRIES
+from resolver.catalog import catalog
+from resolver.engine import engine
+from resolver.mapping import mapping_store
+from utils.batch_tuner import get_batch_tuner
+from utils.cache import SQLiteCache
+from utils.matching import best_candidate
+from utils.metrics import timed, count
+from utils.rate_limit import get_rate_limiter
+from utils.singleflight import SingleFlight
+from utils.text import song_key, song_key_of
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_spotify_playlist(sp, playlist_name: str, description: str):
+# Shared (title, artist) -> {"uri", "score"} cache. A None uri records a negative result.
+track_cache = SQLiteCache(
+    "spotify_tracks",
+    ttl=TRACK_CACHE_TTL,
+    max_entries=TRACK_CACHE_MAX_ENTRIES
+)
+
+def create_spotify_playlist(sp, playlist_name: str, description: str, user_id: str = None):
     """
     Creates a new playlist in the authenticated user's Spotify account.
+    Pass the user's ID when it is already known to skip the profile lookup.
     """
     try:
-        user_id = sp.current_user()['id']
-        playlist = sp.user_playlist_create(user_id, playlist_name, public=False, description=description)
+        limiter = get_rate_limiter("spotify")
+        if user_id is None:
+            user_id = limiter.call_idempotent(sp.current_user)['id']
+        playlist = limiter.call(sp.user_playlist_create, user_id, playlist_name, public=False, description=description)
         logger.info(f"Created Spotify playlist: {playlist_name}")
         return playlist['id']
     except SpotifyException as e:
@@ -27,41 +45,78 @@ def is_valid_spotify_id(spotify_id: str) -> bool:
     """
     return bool(re.fullmatch(r'[0-9A-Za-z]{22}', spotify_id))
 
-def playlist_add_items_with_retry(sp, playlist_id, track_uris, max_retries=3, batch_size=50):
+def playlist_add_items_with_retry(sp, playlist_id, track_uris, max_retries=3, on_batch=None, before_batch=None):
     """
-    Adds track URIs to a playlist with retry logic and batch processing.
-    Spotify API has a limit of 100 tracks per request, but we use a smaller batch size for reliability.
+    Adds track URIs to a playlist in batches, resending a batch only when it was throttled.
+    Batches start at Spotify's limit of 100 tracks per request; the shared batch tuner
+    shrinks and spaces them out when adds get slow or fail, and grows them back after.
+    Calls go through the shared Spotify rate limiter, which handles Retry-After for every session.
+    A 429 is retried up to max_retries attempts in all; any other error is raised, since the
+    batch may already have been added, and a checkpointed save resumes from the last committed batch.
+    before_batch, if given, is called before each batch is sent and may raise to stop the add;
+    on_batch, if given, is called with each batch of URIs once it has been committed.
     """
-    # Process in batches to avoid API limits
-    for i in range(0, len(track_uris), batch_size):
-        batch = track_uris[i:i + batch_size]
-        attempt = 0
-        while attempt < max_retries:
+    limiter = get_rate_limiter("spotify")
+    tuner = get_batch_tuner("spotify")
+    for batch in tuner.batches(track_uris):
+        for attempt in range(max_retries):
+            if before_batch:
+                before_batch()
             try:
-                sp.playlist_add_items(playlist_id, batch)
-                logger.info(f"Added batch of {len(batch)} tracks to playlist")
-                break
+                tuner.call(limiter, sp.playlist_add_items, playlist_id, batch)
             except SpotifyException as e:
-                if e.http_status in [429, 502, 503, 504]:
-                    # Rate limiting or server error, apply exponential backoff
-                    retry_after = int(e.headers.get("Retry-After", "5"))
-                    wait_time = retry_after * (2 ** attempt)  # Exponential backoff
-                    logger.warning(f"Rate limited or server error. Retrying in {wait_time}s. Attempt {attempt+1}/{max_retries}")
-                    time.sleep(wait_time)
-                    attempt += 1
-                else:
-                    logger.error(f"Spotify API error: {e}")
-                    raise
-            except Exception as e:
-                logger.error(f"Unexpected error adding tracks: {e}")
-                attempt += 1
-                if attempt >= max_retries:
-                    raise Exception(f"Failed to add tracks after {max_retries} attempts: {e}")
-                time.sleep(5 * attempt)  # Simple backoff for other errors
+                # A 429 was rejected before anything was added, so the batch is safe to resend;
+                # a 5xx may have been applied and is not retried
+                if e.http_status == 429 and attempt < max_retries - 1:
+                    # The shared limiter has already slowed down and will hold the next call
+                    # for Retry-After, so every session backs off together
+                    logger.warning(f"Rate limited. Retrying at {limiter.rate:.2f} req/s. Attempt {attempt + 2}/{max_retries}")
+                    tuner.wait()
+                    continue
+                logger.error(f"Spotify API error: {e}")
+                raise
+            logger.info(f"Added batch of {len(batch)} tracks to playlist")
+            if on_batch:
+                on_batch(batch)
+            break
 
 def find_track_uri(song: dict, sp):
     """
     Searches for a Spotify track URI based on the song's title and artist.
+    Consults the shared resolution cache, the cross-platform mapping store and the
+    catalog index before searching Spotify.
+    """
+    song_name = song.get('name', '').strip()
+    artist_name = song.get('artist', '').strip()
+    
+    if not song_name or not artist_name:
+        logger.warning(f"Missing song name or artist: {song}")
+        return None
+    
+    key = song_key(song_name, artist_name)
+    cached = track_cache.get(key)
+    if cached is not None and cached["uri"]:
+        return cached["uri"]
+    track_uri = mapping_store.lookup("spotify", key)
+    if track_uri or cached is not None:
+        return track_uri
+    track_uri = catalog.lookup("spotify", song_name, artist_name)
+    if track_uri:
+        return track_uri
+    return search_track_uri(song, sp)
+
+# Sessions saving overlapping playlists at the same time share one search per song
+search_flight = SingleFlight("spotify_search")
+
+def search_track_uri(song: dict, sp):
+    """
+    Searches Spotify for the song and records the outcome in the resolution cache.
+    Concurrent searches for the same song, from any session, share one in-flight lookup.
+    """
+    return search_flight.do(song_key_of(song), _search_track_uri, song, sp)
+
+def _search_track_uri(song: dict, sp):
+    """
     Uses an exact match first, and falls back to a fuzzy match approach.
     """
     song_name = song.get('name', '').strip()
@@ -71,46 +126,33 @@ def find_track_uri(song: dict, sp):
         logger.warning(f"Missing song name or artist: {song}")
         return None
     
+    key = song_key(song_name, artist_name)
     try:
         # Exact match query first (most reliable)
         query = f'track:"{song_name}" artist:"{artist_name}"'
-        result = sp.search(q=query, type='track', limit=1)
+        result = get_rate_limiter("spotify").call_idempotent(timed("platform_search", sp.search, platform="spotify"), q=query, type='track', limit=1)
         tracks = result.get('tracks', {}).get('items', [])
+        highest_ratio = 1.0
         
         # If no exact match, try a broader search with fuzzy matching
         if not tracks:
+            highest_ratio = 0.0
             query = f"{song_name} {artist_name}"
-            result = sp.search(q=query, type='track', limit=10)
+            result = get_rate_limiter("spotify").call_idempotent(timed("platform_search", sp.search, platform="spotify"), q=query, type='track', limit=10)
             tracks = result.get('tracks', {}).get('items', [])
             
             # Use fuzzy matching to find the best candidate
             if tracks:
-                best_match = None
-                highest_ratio = 0
-                for track in tracks:
-                    # Get all artists for this track
-                    artists = [artist["name"].lower() for artist in track["artists"]]
-                    track_name = track["name"].lower()
-                    
-                    # Calculate similarity score for title
-                    title_ratio = difflib.SequenceMatcher(None, song_name.lower(), track_name).ratio()
-                    
-                    # Calculate similarity for artists (check each artist)
-                    artist_ratio = 0
-                    for track_artist in artists:
-                        current_ratio = difflib.SequenceMatcher(None, artist_name.lower(), track_artist).ratio()
-                        artist_ratio = max(artist_ratio, current_ratio)
-                    
-                    # Combined score (weight title slightly more than artist)
-                    combined_ratio = (title_ratio * 0.6) + (artist_ratio * 0.4)
-                    
-                    if combined_ratio > highest_ratio:
-                        highest_ratio = combined_ratio
-                        best_match = track
+                # Weight title slightly more than artist, matching against every track artist
+                candidates = [
+                    (track["name"].lower(), [artist["name"].lower() for artist in track["artists"]])
+                    for track in tracks
+                ]
+                best_index, highest_ratio = best_candidate(song_name, artist_name, candidates)
                 
                 # Only use the match if it's reasonably close
-                if highest_ratio > 0.5:
-                    tracks = [best_match]
+                if best_index is not None and highest_ratio > 0.5:
+                    tracks = [tracks[best_index]]
                 else:
                     tracks = []
         
@@ -118,18 +160,49 @@ def find_track_uri(song: dict, sp):
             track_uri = tracks[0]['uri']
             if track_uri.startswith("spotify:track:"):
                 logger.info(f"Found track: {song_name} by {artist_name}")
+                count("track_resolutions", platform="spotify", outcome="found")
+                track_cache.set(key, {"uri": track_uri, "score": round(highest_ratio, 4)})
+                artists = tracks[0].get('artists') or [{}]
+                catalog.add("spotify", tracks[0].get('name', ''), artists[0].get('name', ''), track_uri)
+                mapping_store.record(
+                    "spotify",
+                    key,
+                    track_uri,
+                    song_key(tracks[0].get('name', ''), artists[0].get('name', '')),
+                    isrc=(tracks[0].get('external_ids') or {}).get('isrc')
+                )
                 return track_uri
             
         logger.warning(f"No matching track found for: {song_name} by {artist_name}")
+        count("track_resolutions", platform="spotify", outcome="not_found")
+        track_cache.set(key, {"uri": None, "score": round(highest_ratio, 4)}, ttl=TRACK_CACHE_NEGATIVE_TTL)
         return None
     except Exception as e:
         logger.error(f"Error finding track URI for '{song_name}' by '{artist_name}': {e}")
+        count("track_resolutions", platform="spotify", outcome="error")
         return None
 
-def add_tracks_to_playlist(sp, playlist_id: str, song_recommendations: list):
+def get_playlist_track_uris(sp, playlist_id: str) -> list:
+    """
+    Returns the URIs of every track already in the playlist.
+    """
+    limiter = get_rate_limiter("spotify")
+    track_uris = []
+    offset = 0
+    while True:
+        page = limiter.call_idempotent(sp.playlist_items, playlist_id, fields="items(track(uri)),next", limit=100, offset=offset)
+        items = page.get("items", [])
+        track_uris.extend(item["track"]["uri"] for item in items if item.get("track"))
+        if not page.get("next") or not items:
+            return track_uris
+        offset += len(items)
+
+def add_tracks_to_playlist(sp, playlist_id: str, song_recommendations: list, checkpoint=None):
     """
     Searches for tracks on Spotify based on the song recommendations and adds them to the playlist.
-    Uses parallelization for improved performance.
+    Searches run concurrently on the shared, rate-limited resolution engine.
+    With a SaveCheckpoint, resolutions and committed batches are recorded as they happen,
+    and a resumed save skips tracks the playlist already contains.
     """
     if not song_recommendations:
         logger.warning("No song recommendations provided")
@@ -147,23 +220,66 @@ def add_tracks_to_playlist(sp, playlist_id: str, song_recommendations: list):
         else:
             songs_to_search.append(song)
     
-    # Use parallel processing to find tracks
+    # Resolve what we can from the checkpoint and the shared cache before searching Spotify
+    if songs_to_search:
+        keys = [song_key(song.get('name', '').strip(), song.get('artist', '').strip()) for song in songs_to_search]
+        cached = track_cache.get_many(keys)
+        # A song already resolved on YouTube Music may be mapped to its Spotify track
+        for key, track_uri in mapping_store.lookup_many("spotify", keys).items():
+            if not cached.get(key, {}).get("uri"):
+                cached[key] = {"uri": track_uri}
+        if checkpoint:
+            cached.update({key: {"uri": checkpoint.resolved[key]} for key in keys if key in checkpoint.resolved})
+        remaining = []
+        for key, song in zip(keys, songs_to_search):
+            if key in cached:
+                if cached[key]["uri"]:
+                    track_uris.append(cached[key]["uri"])
+            else:
+                remaining.append(song)
+        logger.info(f"Resolved {len(songs_to_search) - len(remaining)} tracks from cache")
+        songs_to_search = remaining
+    
+    # Match the rest of the playlist against the catalog index; only misses go to live search
+    if songs_to_search:
+        remaining = []
+        for song, track_uri in zip(songs_to_search, catalog.lookup_many("spotify", songs_to_search)):
+            if track_uri:
+                track_uris.append(track_uri)
+                if checkpoint:
+                    checkpoint.resolved[song_key(song.get('name', '').strip(), song.get('artist', '').strip())] = track_uri
+            else:
+                remaining.append(song)
+        logger.info(f"Resolved {len(songs_to_search) - len(remaining)} tracks from the catalog index")
+        songs_to_search = remaining
+    
+    # Search the remaining songs concurrently on the shared resolution engine
     if songs_to_search:
         logger.info(f"Searching for {len(songs_to_search)} tracks...")
         found_count = 0
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_song = {executor.submit(find_track_uri, song, sp): song for song in songs_to_search}
-            for future in concurrent.futures.as_completed(future_to_song):
-                track_uri = future.result()
-                if track_uri:
-                    track_uris.append(track_uri)
-                    found_count += 1
+        for song, track_uri in zip(songs_to_search, engine.map("spotify", search_track_uri, songs_to_search, sp, key=song_key_of)):
+            if checkpoint:
+                checkpoint.resolved[song_key(song.get('name', '').strip(), song.get('artist', '').strip())] = track_uri
+            if track_uri:
+                track_uris.append(track_uri)
+                found_count += 1
         
         logger.info(f"Found {found_count} out of {len(songs_to_search)} tracks")
+        if checkpoint:
+            checkpoint.save()
+    
+    # A resumed save must not add tracks that an earlier attempt already committed
+    if checkpoint and checkpoint.resumed:
+        existing = checkpoint.existing_ids(lambda: get_playlist_track_uris(sp, playlist_id))
+        track_uris = [uri for uri in track_uris if uri not in existing]
     
     if track_uris:
         logger.info(f"Adding {len(track_uris)} tracks to playlist {playlist_id}")
-        playlist_add_items_with_retry(sp, playlist_id, track_uris)
+        playlist_add_items_with_retry(
+            sp, playlist_id, track_uris,
+            on_batch=checkpoint.mark_added if checkpoint else None,
+            before_batch=checkpoint.ensure_owned if checkpoint else None
+        )
     else:
-        logger.warning("No tracks found to add to playlist")
\ No newline at end of file
+        logger.warning("No tracks found to add to playlist")
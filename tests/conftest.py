@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Point every SQLite store at a throwaway directory before the app modules create their singletons
+_DATA_DIR = tempfile.mkdtemp(prefix="sargam-tests-")
+os.environ["SARGAM_CACHE_DB"] = os.path.join(_DATA_DIR, "cache.sqlite3")
+os.environ["SARGAM_JOBS_DB"] = os.path.join(_DATA_DIR, "jobs.sqlite3")
+os.environ["SARGAM_CREDENTIAL_DB"] = os.path.join(_DATA_DIR, "credentials.sqlite3")
@@ -0,0 +1,126 @@
+import uuid
+import pytest
+from spotipy.exceptions import SpotifyException
+from benchmarks.fakes import FakeSpotify, load_catalog
+from jobs import handlers
+from jobs.queue import LeaseLost
+from spotify.playlist import create_spotify_playlist, add_tracks_to_playlist
+from utils import checkpoint as checkpoint_module
+from utils.checkpoint import CheckpointInUse, SaveCheckpoint
+
+CATALOG = load_catalog(300)
+# Songs carry their Spotify IDs, as after speculative resolution, so no search is needed
+SONGS = [{"name": track["name"], "artist": track["artist"], "spotify_id": track["spotify"]["uri"].rsplit(":", 1)[-1]}
+         for track in CATALOG]
+
+class Report:
+    """
+    Stands in for the worker's Reporter; check() raises LeaseLost once `lose_after` checks have passed.
+    """
+
+    def __init__(self, lose_after: int = None):
+        self.lose_after = lose_after
+        self.checks = 0
+
+    def __call__(self, progress, message=None, state=None):
+        pass
+
+    def check(self):
+        self.checks += 1
+        if self.lose_after is not None and self.checks > self.lose_after:
+            raise LeaseLost("lease lost")
+
+class FailingSpotify(FakeSpotify):
+    """
+    Fails the add call with the given index (counting from 1) once with `status`.
+    With `applied`, the batch is added before the error, as a 5xx may have been.
+    """
+
+    def __init__(self, *args, fail_on: int, status: int = 400, applied: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_on = fail_on
+        self.status = status
+        self.applied = applied
+        self.adds = 0
+
+    def playlist_add_items(self, playlist_id, items, position=None):
+        self.adds += 1
+        if self.adds == self.fail_on:
+            if self.applied:
+                super().playlist_add_items(playlist_id, items, position)
+            raise SpotifyException(self.status, -1, "Request failed")
+        return super().playlist_add_items(playlist_id, items, position)
+
+@pytest.fixture
+def spotify(monkeypatch):
+    client = FakeSpotify(CATALOG, latency=0)
+    monkeypatch.setattr(handlers, "_platform_functions",
+                        lambda platform: (lambda key: client, create_spotify_playlist, add_tracks_to_playlist))
+    return client
+
+def save_job(lease: str, playlist_name: str) -> dict:
+    return {"id": uuid.uuid4().hex, "lease": lease, "payload": {
+        "platform": "spotify", "credential_key": "key", "account": "user", "user_id": "user",
+        "playlist_name": playlist_name, "description": "", "songs": SONGS,
+    }}
+
+def only_playlist(client: FakeSpotify) -> list:
+    assert len(client.playlists) == 1
+    return next(iter(client.playlists.values()))
+
+def test_save_stops_before_next_batch_once_lease_is_lost(spotify):
+    name = uuid.uuid4().hex
+    with pytest.raises(LeaseLost):
+        handlers.save_playlist(save_job("a", name), Report(lose_after=1))
+    assert len(only_playlist(spotify)) == 100
+
+    # The worker that takes the job over resumes into the same playlist without duplicates
+    result = handlers.save_playlist(save_job("b", name), Report())
+    tracks = only_playlist(spotify)
+    assert result["playlist_id"] in spotify.playlists
+    assert len(tracks) == len(set(tracks)) == 300
+
+def test_checkpoint_taken_over_stops_writing(monkeypatch):
+    # Claims expire immediately, so a second owner can take the checkpoint over
+    monkeypatch.setattr(checkpoint_module, "JOB_LEASE_SECONDS", 0)
+    name = uuid.uuid4().hex
+    first = SaveCheckpoint.load("spotify", "user", name, SONGS, owner="a")
+    first.playlist_id = "playlist"
+    first.save()
+    second = SaveCheckpoint.load("spotify", "user", name, SONGS, owner="b")
+    monkeypatch.setattr(checkpoint_module, "JOB_LEASE_SECONDS", 60)
+    second.save()
+
+    with pytest.raises(CheckpointInUse):
+        first.ensure_owned()
+    first.added = 999
+    with pytest.raises(CheckpointInUse):
+        first.mark_added(["spotify:track:x"])
+    assert checkpoint_module.checkpoint_store.get(second.key)["added"] == 0
+
+def test_retry_after_failed_batch_resumes_without_duplicates(monkeypatch):
+    client = FailingSpotify(CATALOG, latency=0, fail_on=2)
+    monkeypatch.setattr(handlers, "_platform_functions",
+                        lambda platform: (lambda key: client, create_spotify_playlist, add_tracks_to_playlist))
+    name = uuid.uuid4().hex
+    with pytest.raises(SpotifyException):
+        handlers.save_playlist(save_job("a", name), Report())
+    assert len(only_playlist(client)) == 100
+
+    handlers.save_playlist(save_job("b", name), Report())
+    tracks = only_playlist(client)
+    assert len(tracks) == len(set(tracks)) == 300
+
+def test_server_error_is_not_resent_but_resumed(monkeypatch):
+    # The 502 arrives after the batch was applied; resending it would duplicate 100 tracks
+    client = FailingSpotify(CATALOG, latency=0, fail_on=2, status=502, applied=True)
+    monkeypatch.setattr(handlers, "_platform_functions",
+                        lambda platform: (lambda key: client, create_spotify_playlist, add_tracks_to_playlist))
+    name = uuid.uuid4().hex
+    with pytest.raises(SpotifyException):
+        handlers.save_playlist(save_job("a", name), Report())
+    assert len(only_playlist(client)) == 200
+
+    handlers.save_playlist(save_job("b", name), Report())
+    tracks = only_playlist(client)
+    assert len(tracks) == len(set(tracks)) == 300
@@ -0,0 +1,71 @@
+import threading
+import time
+import pytest
+from jobs.queue import DONE, FAILED, QUEUED, RUNNING, JobQueue, LeaseLost
+from jobs.worker import HANDLERS, Reporter, WorkerPool
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=1)
+
+def expire_lease(queue: JobQueue, job_id: str):
+    queue._connect().execute("UPDATE jobs SET lease_until = 0 WHERE id = ?", (job_id,))
+
+def test_stale_lease_cannot_update_the_job(queue):
+    job_id = queue.submit("test", {})
+    first = queue.claim()
+    expire_lease(queue, job_id)
+    second = queue.claim()
+    assert second["id"] == job_id and second["lease"] != first["lease"]
+
+    assert not queue.update_progress(job_id, first["lease"], 0.5)
+    assert not queue.renew(job_id, first["lease"])
+    assert not queue.fail(job_id, first["lease"], "stale")
+    assert queue.complete(job_id, second["lease"], {"ok": True})
+    assert not queue.complete(job_id, first["lease"])
+    assert queue.get(job_id)["status"] == DONE
+
+def test_expired_lease_on_last_attempt_fails_the_job(queue):
+    job_id = queue.submit("test", {}, max_attempts=2)
+    queue.claim()
+    expire_lease(queue, job_id)
+    assert queue.claim()["attempts"] == 2
+    expire_lease(queue, job_id)
+    assert queue.claim() is None
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and job["attempts"] == 2
+
+def test_failed_attempt_is_requeued(queue):
+    job_id = queue.submit("test", {})
+    job = queue.claim()
+    assert queue.fail(job_id, job["lease"], "boom")
+    assert queue.get(job_id)["status"] == QUEUED
+
+def test_heartbeat_keeps_a_slow_job_leased(queue, monkeypatch):
+    # The handler runs for several lease lengths without reporting progress
+    def slow(job, report):
+        time.sleep(2.5)
+        report.check()
+        return "done"
+    monkeypatch.setitem(HANDLERS, "slow", slow)
+    job_id = queue.submit("slow", {})
+    worker = threading.Thread(target=WorkerPool(queue).run_job, args=(queue.claim(),))
+    worker.start()
+    time.sleep(1.5)
+    assert queue.get(job_id)["status"] == RUNNING
+    assert queue.claim() is None
+    worker.join()
+    job = queue.get(job_id)
+    assert job["status"] == DONE and job["attempts"] == 1 and job["result"] == "done"
+
+def test_reporter_raises_once_the_lease_is_taken_over(queue):
+    job_id = queue.submit("test", {})
+    job = queue.claim()
+    with Reporter(queue, job) as report:
+        report.check()
+        expire_lease(queue, job_id)
+        queue.claim()
+        with pytest.raises(LeaseLost):
+            report.check()
+        with pytest.raises(LeaseLost):
+            report(0.5, "progress")
@@ -1,4 +1,5 @@
 import streamlit as st
+from config import LARGE_PLAYLIST_MAX
 
 def inject_custom_css():
     """
@@ -86,6 +87,14 @@ def display_interface():
             help="Be specific about the mood, genres, and artists you like",
             height=120
         )
+        target_size = st.number_input(
+            "🔢 Number of Songs",
+            min_value=10,
+            max_value=LARGE_PLAYLIST_MAX,
+            value=25,
+            step=25,
+            help="Larger playlists are generated in parallel parts and take longer"
+        )
     
     st.markdown(
         """
@@ -113,7 +122,18 @@ def display_interface():
         preview_clicked = st.button("👀 Preview Playlist", key="preview_btn")
         save_clicked = st.button("💾 Save to Playlist", key="save_btn")
     
-    return playlist_name, user_prompt, generate_clicked, preview_clicked, save_clicked
+    return playlist_name, user_prompt, int(target_size), generate_clicked, preview_clicked, save_clicked
+
+def _song_card_html(idx, song):
+    """
+    Returns the HTML card used to render a single song in the preview.
+    """
+    return f"""
+    <div style="background:#333333; padding:1rem; border-radius:8px; margin-bottom:0.75rem; text-align:center;">
+        <strong>{idx}. {song.get('name', 'Unknown Song')}</strong><br>
+        <em>by {song.get('artist', 'Unknown Artist')}</em>
+    </div>
+    """
 
 def display_playlist_preview(playlist_details):
     """
@@ -124,12 +144,46 @@ def display_playlist_preview(playlist_details):
     col1, col2, col3 = st.columns([1, 3, 1])
     with col2:
         for idx, song in enumerate(playlist_details, start=1):
-            st.markdown(
-                f"""
-                <div style="background:#333333; padding:1rem; border-radius:8px; margin-bottom:0.75rem; text-align:center;">
-                    <strong>{idx}. {song.get('name', 'Unknown Song')}</strong><br>
-                    <em>by {song.get('artist', 'Unknown Artist')}</em>
+            st.markdown(_song_card_html(idx, song), unsafe_allow_html=True)
+
+def display_streaming_preview(song_stream):
+    """
+    Renders the playlist preview incrementally while songs arrive from the stream.
+    Returns the list of songs that were rendered.
+    """
+    st.markdown("<h2 style='text-align: center; margin-top: 2rem;'>🎵 Generated Playlist Preview</h2>", unsafe_allow_html=True)
+    
+    songs = []
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col2:
+        for idx, song in enumerate(song_stream, start=1):
+            songs.append(song)
+            st.markdown(_song_card_html(idx, song), unsafe_allow_html=True)
+    return songs
+
+
+def display_save_status(job):
+    """
+    Shows the progress or outcome of a background playlist save job.
+    """
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col2:
+        if job["status"] in ("queued", "running"):
+            label = job.get("message") or ("Waiting for a worker..." if job["status"] == "queued" else "Saving...")
+            st.progress(min(1.0, float(job.get("progress") or 0)), text=f"📝 {label}")
+        elif job["status"] == "failed":
+            st.error(f"❌ Error saving your playlist: {job.get('error')}")
+        else:
+            result = job.get("result") or {}
+            if result.get("platform") == "spotify":
+                st.success("🎉 Playlist successfully saved to your Spotify account!")
+                st.markdown(f"""
+                <div style="text-align: center; margin-top: 1rem;">
+                    <a href="https://open.spotify.com/playlist/{result.get('playlist_id')}" target="_blank" 
+                       style="color: #1DB954; text-decoration: none; font-weight: bold;">
+                        Open playlist in Spotify
+                    </a>
                 </div>
-                """,
-                unsafe_allow_html=True
-            )
+                """, unsafe_allow_html=True)
+            else:
+                st.success("🎉 Playlist successfully saved to your YouTube Music account!")
@@ -0,0 +1,2 @@
+# This file makes the utils folder a Python package.
+# Shared helpers used by the agent, spotify and youtube packages.
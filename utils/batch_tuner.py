@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Callable, Dict, Iterator, List
+from config import SPOTIFY_MAX_BATCH, YTMUSIC_MAX_BATCH, BATCH_TARGET_LATENCY
+from utils.metrics import span, count
+from utils.rate_limit import AdaptiveRateLimiter, THROTTLE_STATUSES, http_status_of
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BatchTuner:
+    """
+    Chooses the batch size and the spacing between batches for playlist inserts.
+    Batches start at the largest size the API accepts with no spacing. A slow add
+    shrinks the next batch; an error halves it and doubles the spacing. Fast successes
+    grow the size back toward the maximum and let the spacing decay to zero, so large
+    playlists use the fewest calls the API is currently taking without complaint.
+    """
+
+    def __init__(self, max_size: int, platform: str = "", min_size: int = 5, target_latency: float = BATCH_TARGET_LATENCY,
+                 initial_spacing: float = 0.0, max_spacing: float = 10.0):
+        self.max_size = max(1, max_size)
+        self.platform = platform
+        self.min_size = max(1, min(min_size, self.max_size))
+        self.target_latency = target_latency
+        self.max_spacing = max_spacing
+        self.size = self.max_size
+        self.spacing = initial_spacing
+        self._last_end = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Sleeps until the current spacing has passed since the previous batch finished.
+        """
+        with self._lock:
+            delay = self._last_end + self.spacing - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def record_success(self, batch_len: int, latency: float):
+        with self._lock:
+            self._last_end = time.monotonic()
+            if latency > self.target_latency:
+                # Scale toward a batch that would have met the target latency
+                self.size = max(self.min_size, min(self.size, int(batch_len * self.target_latency / latency)))
+            elif batch_len >= self.size:
+                self.size = min(self.max_size, self.size * 2)
+            self.spacing = self.spacing / 2 if self.spacing > 0.05 else 0.0
+
+    def record_failure(self):
+        with self._lock:
+            self._last_end = time.monotonic()
+            self.size = max(self.min_size, self.size // 2)
+            self.spacing = min(self.max_spacing, max(0.5, self.spacing * 2))
+            logger.warning(f"Playlist add failed, using batches of {self.size} spaced {self.spacing:.1f}s apart")
+
+    def call(self, limiter: AdaptiveRateLimiter, fn: Callable, *args):
+        """
+        Calls fn(*args) through the limiter, where the last argument is the batch.
+        Only the request itself is timed, not the wait for a rate-limit token.
+        Throttling, server and network errors count against the tuning; other
+        errors (e.g. an invalid ID) are re-raised without changing it.
+        """
+        batch = args[-1]
+        timing = {}
+
+        def timed():
+            began = time.monotonic()
+            try:
+                with span("playlist_add", platform=self.platform):
+                    return fn(*args)
+            finally:
+                timing["latency"] = time.monotonic() - began
+
+        try:
+            result = limiter.call(timed)
+        except Exception as e:
+            status = http_status_of(e)
+            if status is None or status in THROTTLE_STATUSES:
+                self.record_failure()
+            raise
+        count("playlist_added_tracks", len(batch), platform=self.platform)
+        self.record_success(len(batch), timing["latency"])
+        return result
+
+    def batches(self, items: List) -> Iterator[List]:
+        """
+        Yields successive batches of items, sized and spaced by the current tuning.
+        The caller must record the outcome of each batch before asking for the next.
+        """
+        start = 0
+        while start < len(items):
+            if start:
+                self.wait()
+            batch = items[start:start + self.size]
+            yield batch
+            start += len(batch)
+
+# Process-wide tuners, one per platform, so concurrent saves learn from each other
+_tuners: Dict[str, BatchTuner] = {}
+_tuners_lock = threading.Lock()
+
+MAX_BATCH_SIZES = {
+    "spotify": SPOTIFY_MAX_BATCH,
+    "ytmusic": YTMUSIC_MAX_BATCH,
+}
+
+def get_batch_tuner(platform: str) -> BatchTuner:
+    """
+    Returns the shared batch tuner for a platform, creating it on first use.
+    """
+    with _tuners_lock:
+        if platform not in _tuners:
+            _tuners[platform] = BatchTuner(MAX_BATCH_SIZES.get(platform, 50), platform=platform)
+        return _tuners[platform]
@@ -0,0 +1,189 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from config import CACHE_DB_PATH
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SQLiteCache:
+    """
+    A small persistent key/value cache backed by SQLite.
+    Entries expire after their TTL and the least recently used entries are evicted
+    once the namespace grows beyond max_entries. Values are stored as JSON.
+    """
+
+    # Evict at most once per this many writes to keep set() cheap
+    EVICT_EVERY = 100
+
+    def __init__(self, namespace: str, db_path: str = CACHE_DB_PATH,
+                 ttl: int = 3600, max_entries: int = 10000):
+        self.namespace = namespace
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached value for key, or None if it is missing or expired.
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Returns a dict of the keys that have a fresh entry in the cache.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                # SQLite limits the number of bound parameters, so query in chunks
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = conn.execute(
+                        f"SELECT key, value FROM cache WHERE namespace = ? AND expires_at > ? AND key IN ({placeholders})",
+                        [self.namespace, now, *chunk]
+                    ).fetchall()
+                    for key, value in rows:
+                        found[key] = json.loads(value)
+                    if rows:
+                        conn.executemany(
+                            "UPDATE cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                            [(now, self.namespace, key) for key, _ in rows]
+                        )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed for namespace '{self.namespace}': {e}")
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """
+        Stores value under key. Uses the cache default TTL unless ttl is given.
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), expires_at, now)
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict(conn, now)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed for namespace '{self.namespace}': {e}")
+
+    def claim(self, key: str, owner: str, ttl: int) -> bool:
+        """
+        Atomically stores owner under key unless another owner holds an unexpired entry.
+        Returns whether owner now holds the key; holding it already renews the TTL.
+        Safe across processes sharing the database.
+        """
+        now = time.time()
+        value = json.dumps(owner)
+        try:
+            with self._lock:
+                conn = self._connect()
+                claimed = conn.execute(
+                    """
+                    INSERT INTO cache (namespace, key, value, expires_at, last_access) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (namespace, key) DO UPDATE SET
+                        value = excluded.value, expires_at = excluded.expires_at, last_access = excluded.last_access
+                    WHERE cache.expires_at <= ? OR cache.value = excluded.value
+                    """,
+                    (self.namespace, key, value, now + ttl, now, now)
+                ).rowcount == 1
+                conn.commit()
+                return claimed
+        except sqlite3.Error as e:
+            logger.warning(f"Cache claim failed for namespace '{self.namespace}': {e}")
+            return False
+
+    def release(self, key: str, owner: str):
+        """
+        Removes key if owner still holds it.
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ? AND value = ?",
+                    (self.namespace, key, json.dumps(owner))
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache release failed for namespace '{self.namespace}': {e}")
+
+    def delete(self, key: str):
+        """
+        Removes a single entry.
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache delete failed for namespace '{self.namespace}': {e}")
+
+    def clear(self):
+        """
+        Removes every entry in this namespace.
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache clear failed for namespace '{self.namespace}': {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """
+        Drops expired entries, then the least recently used ones beyond max_entries.
+        """
+        conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        conn.execute(
+            """
+            DELETE FROM cache WHERE namespace = ? AND key IN (
+                SELECT key FROM cache WHERE namespace = ?
+                ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.namespace, self.namespace, self.max_entries)
+        )
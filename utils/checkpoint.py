@@ -0,0 +1,125 @@
+import hashlib
+import json
+from typing import Callable, Iterable, List, Optional, Set
+from config import SAVE_CHECKPOINT_TTL, JOB_LEASE_SECONDS
+from utils.cache import SQLiteCache
+from utils.text import song_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+checkpoint_store = SQLiteCache("save_checkpoints", ttl=SAVE_CHECKPOINT_TTL, max_entries=10000)
+
+# Which save currently owns each checkpoint; renewed on every checkpoint write
+checkpoint_owners = SQLiteCache("save_checkpoint_owners", ttl=JOB_LEASE_SECONDS, max_entries=10000)
+
+class CheckpointInUse(RuntimeError):
+    """
+    Raised when another save of the same playlist is still running.
+    """
+
+class SaveCheckpoint:
+    """
+    Progress of one playlist save: the playlist ID, every song resolved so far
+    (normalized song key -> platform ID, or None when not found) and how many songs
+    have been fully committed. A retried save with the same platform, account, name and
+    songs loads the checkpoint, reuses the playlist and resolutions, and skips tracks the
+    playlist already contains. Each checkpoint is owned by one save at a time.
+    """
+
+    def __init__(self, key: str, data: Optional[dict] = None, owner: Optional[str] = None,
+                 guard: Optional[Callable[[], None]] = None):
+        data = data or {}
+        self.key = key
+        self.owner = owner
+        self.guard = guard
+        self.playlist_id = data.get("playlist_id")
+        self.resolved = data.get("resolved", {})
+        self.committed_songs = data.get("committed_songs", 0)
+        self.added = data.get("added", 0)
+        # A checkpoint that already has a playlist is resuming an interrupted save
+        self.resumed = bool(self.playlist_id)
+        self._existing: Optional[Set[str]] = None
+
+    @staticmethod
+    def key_for(platform: str, account: str, playlist_name: str, songs: Iterable[dict]) -> str:
+        keys = [song_key(song.get("name", ""), song.get("artist", "")) for song in songs]
+        digest = hashlib.sha256(json.dumps([platform, account, playlist_name, keys]).encode()).hexdigest()
+        return f"{platform}:{digest}"
+
+    @classmethod
+    def load(cls, platform: str, account: str, playlist_name: str, songs: List[dict],
+             owner: str, guard: Optional[Callable[[], None]] = None) -> "SaveCheckpoint":
+        """
+        Loads (or starts) the checkpoint for a save and claims it for owner, e.g. a job lease.
+        A retry by the same owner resumes it; raises CheckpointInUse while another owner
+        holds it, so concurrent saves of the same playlist never share one.
+        guard, if given, raises when the save may no longer proceed (e.g. LeaseLost); it is
+        called before every batch of tracks is sent.
+        """
+        key = cls.key_for(platform, account, playlist_name, songs)
+        if not checkpoint_owners.claim(key, owner, JOB_LEASE_SECONDS):
+            raise CheckpointInUse("A save of this playlist is already in progress")
+        checkpoint = cls(key, checkpoint_store.get(key), owner, guard)
+        if checkpoint.resumed:
+            logger.info(f"Resuming save into playlist {checkpoint.playlist_id} "
+                        f"({checkpoint.committed_songs} songs already committed)")
+        return checkpoint
+
+    def save(self):
+        """
+        Writes the progress and renews ownership; raises CheckpointInUse if another save took it over.
+        """
+        # Checked first, so a save that lost ownership never overwrites the new owner's progress
+        self._renew_claim()
+        checkpoint_store.set(self.key, {
+            "playlist_id": self.playlist_id,
+            "resolved": self.resolved,
+            "committed_songs": self.committed_songs,
+            "added": self.added,
+        })
+
+    def _renew_claim(self):
+        if self.owner and not checkpoint_owners.claim(self.key, self.owner, JOB_LEASE_SECONDS):
+            raise CheckpointInUse("Another save has taken over this playlist")
+
+    def release(self):
+        """
+        Gives up ownership, keeping the progress for a later retry.
+        """
+        if self.owner:
+            checkpoint_owners.release(self.key, self.owner)
+
+    def complete(self):
+        """
+        Discards the checkpoint once the save has finished, so a deliberate re-save starts fresh.
+        """
+        checkpoint_store.delete(self.key)
+        self.release()
+
+    def existing_ids(self, fetch: Callable[[], Iterable[str]]) -> Set[str]:
+        """
+        Returns the IDs already in the playlist, fetching them once per save attempt.
+        """
+        if self._existing is None:
+            self._existing = set(fetch())
+            logger.info(f"Playlist {self.playlist_id} already contains {len(self._existing)} tracks")
+        return self._existing
+
+    def ensure_owned(self):
+        """
+        Raises unless this save may still add tracks. Called before each batch is sent,
+        so a save that has been taken over stops before it can add duplicates.
+        """
+        if self.guard:
+            self.guard()
+        self._renew_claim()
+
+    def mark_added(self, ids: List[str]):
+        """
+        Records a committed batch of IDs.
+        """
+        self.added += len(ids)
+        if self._existing is not None:
+            self._existing.update(ids)
+        self.save()
@@ -0,0 +1,128 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from config import CREDENTIAL_DB_PATH, CREDENTIAL_TTL
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CredentialStore:
+    """
+    OAuth credentials for every session in one SQLite table keyed by platform and
+    session key. Values are JSON, never pickles. Reads are served from memory once an
+    entry has been seen; entries expire CREDENTIAL_TTL seconds after they were last
+    saved and are compacted out of the table periodically.
+    """
+
+    # Compact at most once per this many seconds, from save()
+    COMPACT_EVERY = 3600
+
+    def __init__(self, db_path: str = CREDENTIAL_DB_PATH, ttl: int = CREDENTIAL_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._memory: Dict[Tuple[str, str], Tuple[dict, float]] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._compacted_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS credentials (
+                    platform TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (platform, key)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS credentials_expiry ON credentials (expires_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def load(self, platform: str, key: str) -> Optional[dict]:
+        """
+        Returns the stored credentials, or None if they are missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get((platform, key))
+            if cached is not None:
+                value, expires_at = cached
+                if expires_at > now:
+                    return value
+                del self._memory[(platform, key)]
+                return None
+            try:
+                row = self._connect().execute(
+                    "SELECT value, expires_at FROM credentials WHERE platform = ? AND key = ? AND expires_at > ?",
+                    (platform, key, now)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Credential read failed: {e}")
+                return None
+            if row is None:
+                return None
+            value = json.loads(row[0])
+            self._memory[(platform, key)] = (value, row[1])
+            return value
+
+    def save(self, platform: str, key: str, value: dict):
+        """
+        Stores credentials, replacing any previous ones and restarting their expiry.
+        """
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._memory[(platform, key)] = (value, expires_at)
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO credentials (platform, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (platform, key, json.dumps(value), expires_at)
+                )
+                conn.commit()
+                if now - self._compacted_at >= self.COMPACT_EVERY:
+                    self._compact(now)
+            except sqlite3.Error as e:
+                logger.warning(f"Credential write failed: {e}")
+
+    def delete(self, platform: str, key: str):
+        """
+        Removes stored credentials, e.g. when they have been revoked.
+        """
+        with self._lock:
+            self._memory.pop((platform, key), None)
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM credentials WHERE platform = ? AND key = ?", (platform, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Credential delete failed: {e}")
+
+    def compact(self):
+        """
+        Drops expired credentials from memory and the table.
+        """
+        with self._lock:
+            self._compact(time.time())
+
+    def _compact(self, now: float):
+        self._compacted_at = now
+        self._memory = {k: v for k, v in self._memory.items() if v[1] > now}
+        conn = self._connect()
+        removed = conn.execute("DELETE FROM credentials WHERE expires_at <= ?", (now,)).rowcount
+        conn.commit()
+        if removed:
+            logger.info(f"Compacted {removed} expired credentials")
+
+# Process-wide credential store shared by every session
+credential_store = CredentialStore()
@@ -0,0 +1,68 @@
+import threading
+from http.cookiejar import DefaultCookiePolicy
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import HTTP_POOL_MAXSIZE, HTTP_CONNECT_RETRIES, HTTP_TIMEOUT
+import logging
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_lock = threading.Lock()
+
+class SharedSession(requests.Session):
+    """
+    A Session shared by many clients. spotipy closes its session when a client or auth
+    manager is garbage-collected, which would tear down the keep-alive pool for every
+    user, so close() is a no-op here; the pool lives as long as the process.
+    """
+
+    def close(self):
+        pass
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter that applies a default timeout to requests that set none. Neither
+    ytmusicapi (with a session passed in) nor every spotipy client sets one, and with a
+    blocking pool a few hung sockets would otherwise stall every later caller.
+    """
+
+    def __init__(self, *args, timeout: float = HTTP_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+def build_session(pool_maxsize: int = HTTP_POOL_MAXSIZE, connect_retries: int = HTTP_CONNECT_RETRIES,
+                  timeout: float = HTTP_TIMEOUT) -> requests.Session:
+    """
+    Builds a shared Session with a bounded keep-alive pool per host.
+    The session holds no per-user state: it stores no cookies, and clients pass their
+    auth headers on each request, so one session can safely serve every user.
+    Only connection failures are retried here. Responses, including 429s, are returned
+    as-is so the per-platform rate limiter sees every throttle and does the retrying.
+    """
+    session = SharedSession()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    retry = Retry(total=connect_retries, connect=connect_retries, read=0, status=0, other=0,
+                  raise_on_status=False)
+    # pool_block makes callers beyond the bound wait for a free connection instead of opening throwaway ones
+    adapter = TimeoutHTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize, max_retries=retry, pool_block=True,
+                                 timeout=timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def http_session() -> requests.Session:
+    """
+    Returns the process-wide session that platform clients are built on.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = build_session()
+                logger.info(f"Created shared HTTP session (pool size {HTTP_POOL_MAXSIZE})")
+    return _session
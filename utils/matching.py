@@ -0,0 +1,58 @@
+import difflib
+from typing import List, Optional, Sequence, Tuple
+from utils.metrics import span
+
+# A search candidate as (lowercased title, [lowercased artist names])
+Candidate = Tuple[str, Sequence[str]]
+
+TITLE_WEIGHT = 0.6
+ARTIST_WEIGHT = 0.4
+
+class _QueryScorer:
+    """
+    Scores many candidate strings against one fixed query string.
+    It reuses one SequenceMatcher (query as the first sequence, exactly like the
+    original per-pair calls, so every ratio is identical) and exposes a cheap upper
+    bound on the ratio for pruning.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self._ratios = {}
+        self._matcher = difflib.SequenceMatcher(None)
+        self._matcher.set_seq1(query)
+
+    def ratio(self, candidate: str) -> float:
+        # Search results often repeat the same artist string, so memoize per query
+        if candidate not in self._ratios:
+            self._matcher.set_seq2(candidate)
+            self._ratios[candidate] = self._matcher.ratio()
+        return self._ratios[candidate]
+
+    def upper_bound(self, candidate: str) -> float:
+        if candidate in self._ratios:
+            return self._ratios[candidate]
+        # Length-only bound, computed without indexing the candidate
+        total = len(self.query) + len(candidate)
+        return 2.0 * min(len(self.query), len(candidate)) / total if total else 1.0
+
+def best_candidate(title: str, artist: str, candidates: List[Candidate]) -> Tuple[Optional[int], float]:
+    """
+    Returns (index, score) of the best scoring candidate, or (None, 0.0) if there are none.
+    Candidates whose cheap upper bound cannot beat the current best are skipped,
+    which gives the same result as scoring every pair in full.
+    """
+    with span("fuzzy_match"):
+        title_scorer = _QueryScorer(title.lower())
+        artist_scorer = _QueryScorer(artist.lower())
+        best_index, best_score = None, 0.0
+        for index, (candidate_title, candidate_artists) in enumerate(candidates):
+            title_bound = title_scorer.upper_bound(candidate_title)
+            artist_bound = max((artist_scorer.upper_bound(a) for a in candidate_artists), default=0.0)
+            if title_bound * TITLE_WEIGHT + artist_bound * ARTIST_WEIGHT <= best_score:
+                continue
+            artist_ratio = max((artist_scorer.ratio(a) for a in candidate_artists), default=0.0)
+            score = title_scorer.ratio(candidate_title) * TITLE_WEIGHT + artist_ratio * ARTIST_WEIGHT
+            if score > best_score:
+                best_index, best_score = index, score
+        return best_index, best_score
@@ -0,0 +1,211 @@
+import bisect
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Tuple
+from config import METRICS_PORT, METRICS_FILE, METRICS_EXPORT_INTERVAL
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets, from fast cache reads to slow agent runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PREFIX = "sargam_"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: dict) -> Labels:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Labels, extra: Tuple[str, str] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Counter:
+    """
+    A monotonically increasing count per label set.
+    """
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines)
+
+class Histogram:
+    """
+    Cumulative latency buckets, a sum and a count per label set, as Prometheus expects.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines)
+
+class Registry:
+    """
+    Holds every metric in the process and renders them in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str):
+        name = PREFIX + name
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help_text)
+            return self._metrics[name]
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self._get(Counter, name, help_text or name)
+
+    def histogram(self, name: str, help_text: str = "") -> Histogram:
+        return self._get(Histogram, name, help_text or name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return "\n".join(metric.render() for _, metric in metrics) + "\n"
+
+registry = Registry()
+
+@contextmanager
+def span(name: str, **labels):
+    """
+    Times the enclosed block into the `<name>_seconds` histogram.
+    A block that raises also increments `<name>_errors_total`, and still records its duration.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registry.counter(f"{name}_errors_total", f"Failed {name} operations").inc(**labels)
+        raise
+    finally:
+        registry.histogram(f"{name}_seconds", f"Duration of {name} in seconds").observe(time.perf_counter() - start, **labels)
+
+def timed(name: str, fn: Callable, **labels) -> Callable:
+    """
+    Wraps fn so every call is recorded as a span, e.g. for calls made through a rate limiter
+    where only the request itself should be timed.
+    """
+    def wrapper(*args, **kwargs):
+        with span(name, **labels):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def count(name: str, amount: float = 1.0, **labels):
+    """
+    Increments the `<name>_total` counter.
+    """
+    registry.counter(f"{name}_total", f"Number of {name.replace('_', ' ')}").inc(amount, **labels)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise flood stderr
+        pass
+
+def write_metrics_file(path: str = METRICS_FILE):
+    """
+    Writes the current metrics to path atomically, for a textfile collector to pick up.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w") as handle:
+        handle.write(registry.render())
+    os.replace(tmp_path, path)
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+def start_exporters(port: int = METRICS_PORT, path: str = METRICS_FILE, interval: float = METRICS_EXPORT_INTERVAL):
+    """
+    Starts the configured exporters once per process: an HTTP /metrics endpoint when
+    port is set, and a file rewritten every `interval` seconds when path is set.
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"Serving metrics on :{port}/metrics")
+        except OSError as e:
+            logger.error(f"Could not start metrics endpoint on port {port}: {e}")
+
+    if path:
+        def export_loop():
+            while True:
+                try:
+                    write_metrics_file(path)
+                except Exception as e:
+                    logger.error(f"Failed to write metrics file {path}: {e}")
+                time.sleep(interval)
+        threading.Thread(target=export_loop, name="metrics-file", daemon=True).start()
+        logger.info(f"Writing metrics to {path} every {interval:g}s")
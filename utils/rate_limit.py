@@ -0,0 +1,161 @@
+import re
+import threading
+import time
+from typing import Callable, Dict
+from config import SPOTIFY_REQUESTS_PER_SECOND, YTMUSIC_REQUESTS_PER_SECOND, THROTTLE_RETRIES
+import logging
+
+logger = logging.getLogger(__name__)
+
+_STATUS_IN_MESSAGE = re.compile(r'\b(?:HTTP|status(?: code)?)[ :]*([1-5]\d\d)\b', re.IGNORECASE)
+
+class TokenBucket:
+    """
+    A thread-safe token bucket.
+    Tokens refill continuously at `rate` per second up to `capacity`; each call takes one.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns how long the caller must wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """
+        Blocks until a token is available.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+def http_status_of(error: Exception):
+    """
+    Best-effort extraction of the HTTP status code carried by a client exception.
+    Handles spotipy (http_status), requests (response.status_code) and ytmusicapi,
+    which reports server errors only in the message text.
+    """
+    status = getattr(error, "http_status", None) or getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    if status is None:
+        match = _STATUS_IN_MESSAGE.search(str(error))
+        if match:
+            status = int(match.group(1))
+    return status
+
+def retry_after_of(error: Exception):
+    """
+    Returns the Retry-After delay in seconds carried by a client exception, if any.
+    """
+    headers = getattr(error, "headers", None)
+    if headers is None and getattr(error, "response", None) is not None:
+        headers = getattr(error.response, "headers", None)
+    try:
+        return float(headers.get("Retry-After")) if headers and headers.get("Retry-After") else None
+    except (TypeError, ValueError):
+        return None
+
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    A token bucket whose rate adapts to the API's responses (AIMD).
+    Every success raises the rate additively; a 429 or 5xx halves it and pauses all
+    callers for the Retry-After period. Because one limiter is shared per platform,
+    every session backs off together and throughput settles near the real limit.
+    """
+
+    def __init__(self, rate: float, min_rate: float = 0.5, max_rate: float = None,
+                 increase: float = 0.05, decrease: float = 0.5, cooldown: float = 1.0):
+        super().__init__(rate, capacity=max(1.0, rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate * 2
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+    def reserve(self) -> float:
+        wait = super().reserve()
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+        return max(wait, pause)
+
+    def record_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def record_throttle(self, retry_after: float = None):
+        with self._lock:
+            now = time.monotonic()
+            # A burst of 429s from one window should only cut the rate once
+            if now - self._last_decrease >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+                logger.warning(f"Throttled by API, reducing rate to {self.rate:.2f} req/s")
+            # Without a Retry-After hint, hold callers for one interval at the reduced rate
+            delay = retry_after if retry_after else 1.0 / self.rate
+            self._paused_until = max(self._paused_until, now + delay)
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """
+        Calls fn through the limiter and feeds the outcome back into the rate.
+        Exceptions are re-raised unchanged after being recorded.
+        """
+        self.acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if http_status_of(e) in THROTTLE_STATUSES:
+                self.record_throttle(retry_after_of(e))
+            raise
+        self.record_success()
+        return result
+
+    def call_idempotent(self, fn: Callable, *args, **kwargs):
+        """
+        Like call(), but a throttled call (429 or 5xx) is retried once the limiter's pause
+        has passed, up to THROTTLE_RETRIES times. Only for requests that are safe to repeat;
+        other errors, and the last throttle, are re-raised.
+        """
+        for attempt in range(THROTTLE_RETRIES + 1):
+            try:
+                return self.call(fn, *args, **kwargs)
+            except Exception as e:
+                if attempt == THROTTLE_RETRIES or http_status_of(e) not in THROTTLE_STATUSES:
+                    raise
+                logger.info(f"Retrying throttled call (attempt {attempt + 2} of {THROTTLE_RETRIES + 1})")
+
+# Process-wide limiters, one per platform host
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+DEFAULT_RATES = {
+    "spotify": SPOTIFY_REQUESTS_PER_SECOND,
+    "ytmusic": YTMUSIC_REQUESTS_PER_SECOND,
+}
+
+def get_rate_limiter(platform: str) -> AdaptiveRateLimiter:
+    """
+    Returns the shared rate limiter for a platform, creating it on first use.
+    """
+    with _limiters_lock:
+        if platform not in _limiters:
+            _limiters[platform] = AdaptiveRateLimiter(DEFAULT_RATES.get(platform, 5.0))
+        return _limiters[platform]
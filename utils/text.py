@@ -0,0 +1,33 @@
+import re
+import unicodedata
+
+# Featured-artist credits that do not identify a song. The marker must follow some title
+# text and be followed by a credit, so "Feat of Clay", "Ft. Lauderdale" and the artist
+# "Little Feat" are left alone.
+_FEAT_PATTERN = re.compile(r'(?<=\S)(?:\s+|\s*[\(\[]\s*)(?:feat|ft|featuring)\b\.?\s*(?!(?:feat|ft|featuring)\b)\w.*$', re.IGNORECASE)
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+def normalize_text(value: str) -> str:
+    """
+    Normalizes a title or artist string for comparison and cache keys.
+    Lowercases, strips accents, drops featured-artist suffixes and collapses punctuation.
+    """
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    value = _FEAT_PATTERN.sub("", value.lower())
+    return _NON_ALNUM.sub(" ", value).strip()
+
+def song_key(song_name: str, artist_name: str) -> str:
+    """
+    Builds the normalized (title, artist) key used to share lookups between sessions.
+    """
+    return f"{normalize_text(song_name)}|{normalize_text(artist_name)}"
+
+
+def song_key_of(song: dict) -> str:
+    """
+    Returns the song_key of a {"name", "artist"} song dict.
+    """
+    return song_key(song.get("name", ""), song.get("artist", ""))
@@ -1,17 +1,58 @@
 # youtube/auth.py
 import uuid
 import streamlit as st
-import os
-import pickle
+import json
+from datetime import datetime
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from config import (
     YTMUSIC_CLIENT_ID,
     YTMUSIC_CLIENT_SECRET,
-    YTMUSIC_REDIRECT_URI
+    YTMUSIC_REDIRECT_URI,
+    TOKEN_REFRESH_MARGIN
 )
 from google.oauth2.credentials import Credentials
 from ytmusicapi import YTMusic
+from utils.http import http_session
+from utils.credentials import credential_store
+
+def build_ytmusic_client(token: str) -> YTMusic:
+    """
+    Builds a YTMusic client for an OAuth access token on the shared HTTP connection pool.
+    """
+    ytmusic = YTMusic(requests_session=http_session())
+    ytmusic.setup(token)
+    return ytmusic
+
+def load_ytmusic_credentials(cache_key: str) -> Credentials:
+    """
+    Loads the credentials stored under cache_key, refreshing them (and storing the result)
+    when they expire within TOKEN_REFRESH_MARGIN.
+    
+    Args:
+        cache_key: Credential store key of the session that logged in
+        
+    Returns:
+        Credentials: Credentials with a current access token
+    """
+    stored = credential_store.load("ytmusic", cache_key)
+    if not stored:
+        raise RuntimeError("YouTube Music credentials have expired; log in again to save")
+    if not stored.get("refresh_token"):
+        # A bare access token (e.g. handed to the batch CLI) is used as-is
+        return Credentials(token=stored["token"])
+    credentials = Credentials.from_authorized_user_info(stored)
+    expires_in = (credentials.expiry - datetime.utcnow()).total_seconds() if credentials.expiry else 0
+    if not credentials.token or expires_in < TOKEN_REFRESH_MARGIN:
+        credentials.refresh(Request())
+        credential_store.save("ytmusic", cache_key, json.loads(credentials.to_json()))
+    return credentials
+
+def build_ytmusic_job_client(cache_key: str) -> YTMusic:
+    """
+    Builds a YTMusic client for a background job from the credentials stored under cache_key.
+    """
+    return build_ytmusic_client(load_ytmusic_credentials(cache_key).token)
 
 def youtube_authenticate():
     """
@@ -31,25 +72,27 @@ def youtube_authenticate():
         }
     }
     
-    # Use a unique file for caching tokens
-    if 'youtube_cache_path' not in st.session_state:
-        st.session_state.youtube_cache_path = f".ytmusic_token_{uuid.uuid4()}.pkl"
+    # Credentials are kept in the shared credential store under a per-session key
+    if 'youtube_cache_key' not in st.session_state:
+        st.session_state.youtube_cache_key = str(uuid.uuid4())
+    cache_key = st.session_state.youtube_cache_key
     
     # Check if we already have valid credentials
     credentials = None
-    if os.path.exists(st.session_state.youtube_cache_path):
-        with open(st.session_state.youtube_cache_path, "rb") as token_file:
-            try:
-                credentials = pickle.load(token_file)
-                if credentials and credentials.expired and credentials.refresh_token:
-                    try:
-                        credentials.refresh(Request())
-                    except Exception:
-                        credentials = None
-            except Exception:
-                # Handle corrupt token file
-                credentials = None
-                os.remove(st.session_state.youtube_cache_path)
+    stored = credential_store.load("ytmusic", cache_key)
+    if stored:
+        try:
+            credentials = Credentials.from_authorized_user_info(stored, scopes)
+            if credentials.expired and credentials.refresh_token:
+                try:
+                    credentials.refresh(Request())
+                    credential_store.save("ytmusic", cache_key, json.loads(credentials.to_json()))
+                except Exception:
+                    credentials = None
+        except Exception:
+            # Handle malformed stored credentials
+            credentials = None
+            credential_store.delete("ytmusic", cache_key)
     
     # If not valid, start the flow
     if not credentials or not credentials.valid:
@@ -83,8 +126,7 @@ def youtube_authenticate():
                 flow.fetch_token(code=st.session_state.yt_code)
                 credentials = flow.credentials
                 # Cache the credentials
-                with open(st.session_state.youtube_cache_path, "wb") as token_file:
-                    pickle.dump(credentials, token_file)
+                credential_store.save("ytmusic", cache_key, json.loads(credentials.to_json()))
             except Exception as e:
                 st.error(f"Failed to get YouTube credentials: {e}")
                 # Clear the code so the user can try again
@@ -95,9 +137,7 @@ def youtube_authenticate():
     # At this point, we have valid credentials
     try:
         # Use header_auth=True to ensure proper authentication with tokens
-        ytmusic = YTMusic()
-        ytmusic.setup(credentials.token)
-        return ytmusic
+        return build_ytmusic_client(credentials.token)
     except Exception as e:
         st.error(f"YTMusic authentication failed: {e}")
         return None
\ No newline at end of file
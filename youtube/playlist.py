@@ -1,8 +1,26 @@
 # youtube/playlist.py
-import difflib
-import concurrent.futures
-import time
 from typing import List, Dict, Any, Optional
+from config import TRACK_CACHE_TTL, TRACK_CACHE_NEGATIVE_TTL, TRACK_CACHE_MAX_ENTRIES, THROTTLE_RETRIES
+from resolver.catalog import catalog
+from resolver.engine import engine
+from resolver.mapping import mapping_store
+from utils.batch_tuner import get_batch_tuner
+from utils.cache import SQLiteCache
+from utils.matching import best_candidate
+from utils.metrics import timed, count
+from utils.rate_limit import get_rate_limiter, http_status_of
+from utils.singleflight import SingleFlight
+from utils.text import song_key, song_key_of
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Shared (title, artist) -> {"video_id", "score"} cache. A None video_id is a "not found" tombstone.
+track_cache = SQLiteCache(
+    "youtube_tracks",
+    ttl=TRACK_CACHE_TTL,
+    max_entries=TRACK_CACHE_MAX_ENTRIES
+)
 
 def create_youtube_playlist(ytmusic, playlist_name: str, description: str) -> Optional[str]:
     """
@@ -17,15 +35,17 @@ def create_youtube_playlist(ytmusic, playlist_name: str, description: str) -> Op
         str: Playlist ID if successful, None otherwise
     """
     try:
-        playlist_id = ytmusic.create_playlist(title=playlist_name, description=description)
+        playlist_id = get_rate_limiter("ytmusic").call(ytmusic.create_playlist, title=playlist_name, description=description)
         return playlist_id
     except Exception as e:
-        print(f"Error creating YouTube Music playlist: {e}")
+        logger.error(f"Error creating YouTube Music playlist: {e}")
         return None
 
 def find_youtube_track_id(song: Dict[str, Any], ytmusic) -> Optional[str]:
     """
     Searches for a YouTube Music track based on the song's title and artist.
+    Consults the shared resolution cache, the cross-platform mapping store and the
+    catalog index before searching YouTube Music.
     
     Args:
         song: Dictionary containing 'name' and 'artist' keys
@@ -39,21 +59,69 @@ def find_youtube_track_id(song: Dict[str, Any], ytmusic) -> Optional[str]:
     
     if not song_name:
         return None
+    
+    key = song_key(song_name, artist_name)
+    cached = track_cache.get(key)
+    if cached is not None and cached["video_id"]:
+        return cached["video_id"]
+    video_id = mapping_store.lookup("ytmusic", key)
+    if video_id or cached is not None:
+        return video_id
+    video_id = catalog.lookup("ytmusic", song_name, artist_name)
+    if video_id:
+        return video_id
+    return search_youtube_track_id(song, ytmusic)
+
+# Sessions saving overlapping playlists at the same time share one search per song
+search_flight = SingleFlight("ytmusic_search")
+
+def search_youtube_track_id(song: Dict[str, Any], ytmusic) -> Optional[str]:
+    """
+    Searches YouTube Music for the song and records the outcome in the resolution cache.
+    Concurrent searches for the same song, from any session, share one in-flight lookup.
+    
+    Args:
+        song: Dictionary containing 'name' and 'artist' keys
+        ytmusic: Authenticated YTMusic instance
+        
+    Returns:
+        str: YouTube video ID if found, None otherwise
+    """
+    return search_flight.do(song_key_of(song), _search_youtube_track_id, song, ytmusic)
+
+def _search_youtube_track_id(song: Dict[str, Any], ytmusic) -> Optional[str]:
+    """
+    Runs the search for search_youtube_track_id.
+    
+    Args:
+        song: Dictionary containing 'name' and 'artist' keys
+        ytmusic: Authenticated YTMusic instance
         
+    Returns:
+        str: YouTube video ID if found, None otherwise
+    """
+    song_name = song.get('name', '').strip()
+    artist_name = song.get('artist', '').strip()
+    
+    if not song_name:
+        return None
+    
+    key = song_key(song_name, artist_name)
     query = f"{song_name} {artist_name}".strip()
     
     try:
-        results = ytmusic.search(query, filter="songs", limit=5)
+        limiter = get_rate_limiter("ytmusic")
+        search = timed("platform_search", ytmusic.search, platform="ytmusic")
+        results = limiter.call_idempotent(search, query, filter="songs", limit=5)
         
         if not results:
             # Try with just the song name if no results found
-            results = ytmusic.search(song_name, filter="songs", limit=5)
+            results = limiter.call_idempotent(search, song_name, filter="songs", limit=5)
             
         if results:
             # Use fuzzy matching to determine the best candidate
-            best_match = None
-            highest_ratio = 0
-            
+            candidates = []
+            artist_names = []
             for result in results:
                 # Get artist names as a string
                 artist_strings = []
@@ -62,29 +130,53 @@ def find_youtube_track_id(song: Dict[str, Any], ytmusic) -> Optional[str]:
                         artist_strings.append(artist["name"])
                     elif isinstance(artist, str):
                         artist_strings.append(artist)
-                
-                candidate_artists = " ".join(artist_strings).lower()
-                candidate_title = result.get("title", "").lower()
-                
-                # Calculate match ratio based on both artist and title
-                artist_ratio = difflib.SequenceMatcher(None, artist_name.lower(), candidate_artists).ratio()
-                title_ratio = difflib.SequenceMatcher(None, song_name.lower(), candidate_title).ratio()
-                combined_ratio = (artist_ratio * 0.4) + (title_ratio * 0.6)  # Weight title more
-                
-                if combined_ratio > highest_ratio:
-                    highest_ratio = combined_ratio
-                    best_match = result
+                artist_names.append(artist_strings)
+                candidates.append((result.get("title", "").lower(), [" ".join(artist_strings).lower()]))
+            
+            # Match ratio based on both artist and title, weighting title more
+            best_index, highest_ratio = best_candidate(song_name, artist_name, candidates)
+            best_match = results[best_index] if best_index is not None else None
             
             # Only return if we have a decent match
-            if best_match and highest_ratio > 0.6:
-                return best_match.get("videoId")
+            if best_match and highest_ratio > 0.6 and best_match.get("videoId"):
+                count("track_resolutions", platform="ytmusic", outcome="found")
+                track_cache.set(key, {"video_id": best_match["videoId"], "score": round(highest_ratio, 4)})
+                primary_artist = artist_names[best_index][0] if artist_names[best_index] else ""
+                catalog.add("ytmusic", best_match.get("title", ""), primary_artist, best_match["videoId"])
+                mapping_store.record(
+                    "ytmusic",
+                    key,
+                    best_match["videoId"],
+                    song_key(best_match.get("title", ""), primary_artist)
+                )
+                return best_match["videoId"]
+        
+        # Remember the miss for a shorter period so new releases are picked up
+        count("track_resolutions", platform="ytmusic", outcome="not_found")
+        track_cache.set(key, {"video_id": None, "score": 0.0}, ttl=TRACK_CACHE_NEGATIVE_TTL)
                 
     except Exception as e:
-        print(f"Error finding YouTube track ID for '{song_name}' by '{artist_name}': {e}")
+        logger.error(f"Error finding YouTube track ID for '{song_name}' by '{artist_name}': {e}")
+        count("track_resolutions", platform="ytmusic", outcome="error")
         
     return None
 
-def add_tracks_to_youtube_playlist(ytmusic, playlist_id: str, song_recommendations: List[Dict[str, Any]]) -> int:
+def get_playlist_video_ids(ytmusic, playlist_id: str) -> List[str]:
+    """
+    Returns the video IDs of every track already in the playlist.
+    
+    Args:
+        ytmusic: Authenticated YTMusic instance
+        playlist_id: ID of the playlist to read
+        
+    Returns:
+        list: Video IDs in playlist order
+    """
+    playlist = get_rate_limiter("ytmusic").call_idempotent(ytmusic.get_playlist, playlist_id, limit=None)
+    return [track["videoId"] for track in playlist.get("tracks", []) if track.get("videoId")]
+
+def add_tracks_to_youtube_playlist(ytmusic, playlist_id: str, song_recommendations: List[Dict[str, Any]],
+                                   checkpoint=None) -> int:
     """
     Searches for tracks on YouTube Music and adds them to the playlist.
     
@@ -92,6 +184,8 @@ def add_tracks_to_youtube_playlist(ytmusic, playlist_id: str, song_recommendatio
         ytmusic: Authenticated YTMusic instance
         playlist_id: ID of the playlist to add tracks to
         song_recommendations: List of song dictionaries with 'name' and 'artist' keys
+        checkpoint: Optional SaveCheckpoint; resolutions and committed batches are recorded,
+            and a resumed save skips videos the playlist already contains
         
     Returns:
         int: Number of songs successfully added to the playlist
@@ -104,52 +198,103 @@ def add_tracks_to_youtube_playlist(ytmusic, playlist_id: str, song_recommendatio
     successful_songs = []
     failed_songs = []
     
-    # Process in batches to prevent rate limiting
-    batch_size = 10
-    for i in range(0, len(song_recommendations), batch_size):
-        batch = song_recommendations[i:i+batch_size]
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_song = {
-                executor.submit(find_youtube_track_id, song, ytmusic): song 
-                for song in batch
-            }
-            
-            for future in concurrent.futures.as_completed(future_to_song):
-                song = future_to_song[future]
-                try:
-                    video_id = future.result()
-                    if video_id:
-                        video_ids.append(video_id)
-                        successful_songs.append(f"{song.get('name')} by {song.get('artist')}")
-                    else:
-                        failed_songs.append(f"{song.get('name')} by {song.get('artist')}")
-                except Exception as e:
-                    print(f"Error processing {song.get('name')}: {e}")
-                    failed_songs.append(f"{song.get('name')} by {song.get('artist')}")
-        
-        # Add a short delay between batches to avoid rate limiting
-        if i + batch_size < len(song_recommendations):
-            time.sleep(1)
+    # Songs resolved ahead of time (e.g. by the speculative pipeline) carry their video ID
+    unresolved = []
+    for song in song_recommendations:
+        video_id = (song.get('video_id') or '').strip()
+        if video_id:
+            video_ids.append(video_id)
+            successful_songs.append(f"{song.get('name')} by {song.get('artist')}")
+        else:
+            unresolved.append(song)
+    
+    # Resolve what we can from the shared cache before searching YouTube Music
+    keys = [song_key(song.get('name', '').strip(), song.get('artist', '').strip()) for song in unresolved]
+    cached = track_cache.get_many(keys)
+    # A song already resolved on Spotify may be mapped to its YouTube Music video
+    for key, video_id in mapping_store.lookup_many("ytmusic", keys).items():
+        if not cached.get(key, {}).get("video_id"):
+            cached[key] = {"video_id": video_id}
+    if checkpoint:
+        cached.update({key: {"video_id": checkpoint.resolved[key]} for key in keys if key in checkpoint.resolved})
+    songs_to_search = []
+    for key, song in zip(keys, unresolved):
+        if key in cached:
+            if cached[key]["video_id"]:
+                video_ids.append(cached[key]["video_id"])
+                successful_songs.append(f"{song.get('name')} by {song.get('artist')}")
+            else:
+                failed_songs.append(f"{song.get('name')} by {song.get('artist')}")
+        else:
+            songs_to_search.append(song)
+    logger.info(f"Resolved {len(unresolved) - len(songs_to_search)} songs from cache")
+    
+    # Match the rest of the playlist against the catalog index; only misses go to live search
+    remaining = []
+    for song, video_id in zip(songs_to_search, catalog.lookup_many("ytmusic", songs_to_search)):
+        if video_id:
+            video_ids.append(video_id)
+            successful_songs.append(f"{song.get('name')} by {song.get('artist')}")
+            if checkpoint:
+                checkpoint.resolved[song_key(song.get('name', '').strip(), song.get('artist', '').strip())] = video_id
+        else:
+            remaining.append(song)
+    logger.info(f"Resolved {len(songs_to_search) - len(remaining)} songs from the catalog index")
+    songs_to_search = remaining
+    
+    # Search the remaining songs concurrently on the shared, rate-limited resolution engine
+    for song, video_id in zip(songs_to_search, engine.map("ytmusic", search_youtube_track_id, songs_to_search, ytmusic, key=song_key_of)):
+        if checkpoint:
+            checkpoint.resolved[song_key(song.get('name', '').strip(), song.get('artist', '').strip())] = video_id
+        if video_id:
+            video_ids.append(video_id)
+            successful_songs.append(f"{song.get('name')} by {song.get('artist')}")
+        else:
+            failed_songs.append(f"{song.get('name')} by {song.get('artist')}")
+    
+    if checkpoint and songs_to_search:
+        checkpoint.save()
+    
+    # A resumed save must not add videos that an earlier attempt already committed
+    if checkpoint and checkpoint.resumed:
+        existing = checkpoint.existing_ids(lambda: get_playlist_video_ids(ytmusic, playlist_id))
+        video_ids = [video_id for video_id in video_ids if video_id not in existing]
     
     # Add videos to playlist in batches
     successfully_added = 0
     if video_ids:
-        batch_size = 50  # YouTube typically limits to 50 items per add operation
-        for i in range(0, len(video_ids), batch_size):
-            batch = video_ids[i:i+batch_size]
-            try:
-                status = ytmusic.add_playlist_items(playlist_id, batch)
-                successfully_added += len(batch)
-            except Exception as e:
-                print(f"Error adding tracks to playlist: {e}")
-            
-            # Add a short delay between batches
-            if i + batch_size < len(video_ids):
-                time.sleep(1)
+        # Batch size and spacing adapt to how YouTube Music is responding (at most 50 per add)
+        limiter = get_rate_limiter("ytmusic")
+        tuner = get_batch_tuner("ytmusic")
+        for batch in tuner.batches(video_ids):
+            for attempt in range(THROTTLE_RETRIES + 1):
+                if checkpoint:
+                    # Stop before sending if this save has been taken over
+                    checkpoint.ensure_owned()
+                try:
+                    response = tuner.call(limiter, ytmusic.add_playlist_items, playlist_id, batch)
+                    # ytmusicapi reports a rejected batch in the response instead of raising
+                    status = response.get("status", "") if isinstance(response, dict) else ""
+                    if "FAILED" in status:
+                        raise RuntimeError(f"YouTube Music rejected the batch ({status})")
+                    successfully_added += len(batch)
+                    if checkpoint:
+                        checkpoint.mark_added(batch)
+                    break
+                except Exception as e:
+                    # A 429 was rejected before anything was added, so the batch is safe to resend;
+                    # a 5xx may have been applied and is not retried
+                    if http_status_of(e) == 429 and attempt < THROTTLE_RETRIES:
+                        logger.warning(f"Playlist add throttled, retrying (attempt {attempt + 2} of {THROTTLE_RETRIES + 1})")
+                        tuner.wait()
+                        continue
+                    logger.error(f"Error adding tracks to playlist: {e}")
+                    if checkpoint:
+                        # Stop here so a retry resumes from the last committed batch
+                        raise
+                    break
     
-    # Print summary for debugging
-    print(f"Successfully found {len(video_ids)} out of {len(song_recommendations)} songs")
-    print(f"Successfully added {successfully_added} songs to playlist {playlist_id}")
+    logger.info(f"Successfully found {len(video_ids)} out of {len(song_recommendations)} songs")
+    logger.info(f"Successfully added {successfully_added} songs to playlist {playlist_id}")
     
     return successfully_added
\ No newline at end of file